@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# Compare the fp32 and the int8 dynamically quantized all-MiniLM-L6-v2 ONNX models:
+# CPU throughput, cosine similarity between the two embeddings of the same text and
+# overlap of the top-k nearest neighbours (what a vector search would return).
+# The quantized model is created from model.onnx on first use and cached next to it.
+# python3 benchmark_embedding_quantization.py [documents] [top_k]
+
+import random
+import sys
+import time
+
+import numpy as np
+from pyepsilla.vectordb.utils.embedding_functions import ONNXMiniLM_L6_V2
+
+documents_num = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+top_k = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+random.seed(0)
+words = (
+    "vector database search embedding index query table field record cluster "
+    "memory disk latency throughput model token sentence document retrieval "
+    "score distance neighbour similarity cosine euclidean dimension batch"
+).split()
+documents = [
+    " ".join(random.choice(words) for _ in range(random.randint(4, 64)))
+    for _ in range(documents_num)
+]
+
+
+def bench(name, embedding_function):
+    embedding_function(documents[:8])
+    start = time.perf_counter()
+    embeddings = np.asarray(embedding_function(documents), dtype=np.float32)
+    elapsed = time.perf_counter() - start
+    print("{:<10} {:>10.0f} docs/s".format(name, documents_num / elapsed))
+    return embeddings
+
+
+def neighbours(embeddings, queries):
+    scores = embeddings[:queries] @ embeddings.T
+    return np.argsort(-scores, axis=1)[:, 1 : top_k + 1]
+
+
+fp32 = bench("fp32", ONNXMiniLM_L6_V2())
+int8 = bench("int8", ONNXMiniLM_L6_V2(quantized=True))
+
+# embeddings are L2 normalized, so the row-wise dot product is the cosine similarity
+cosine = np.sum(fp32 * int8, axis=1)
+print("cosine(fp32, int8): mean {:.4f} min {:.4f}".format(cosine.mean(), cosine.min()))
+queries = min(200, documents_num)
+overlap = [
+    len(set(a) & set(b)) / top_k
+    for a, b in zip(neighbours(fp32, queries), neighbours(int8, queries))
+]
+print("top-{} neighbour overlap: {:.3f}".format(top_k, np.mean(overlap)))
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# Measure cold import time with `python -X importtime` in fresh interpreters.
+# Prints the median total import time of each target and its heaviest imports;
+# with --record the medians are appended as one JSON line per run to a file,
+# so import time can be tracked across versions.
+# python3 benchmark_import_time.py [--runs 10] [--top 10] [--record import_time.jsonl] [module ...]
+
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import subprocess
+import sys
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "modules", nargs="*", default=["pyepsilla", "pyepsilla.vectordb", "pyepsilla.cloud"]
+)
+parser.add_argument("--runs", type=int, default=10)
+parser.add_argument("--top", type=int, default=10)
+parser.add_argument("--record", default=None)
+args = parser.parse_args()
+
+
+def import_times(module):
+    """{imported module: cumulative microseconds} for one cold import of module."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import {}".format(module)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if name.strip() == "site":
+            # interpreter startup, not part of the import being measured
+            times = {}
+            continue
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+medians = {}
+for module in args.modules:
+    runs = [import_times(module) for _ in range(args.runs)]
+    names = set().union(*runs)
+    median = {
+        name: statistics.median(run.get(name, 0) for run in runs) for name in names
+    }
+    medians[module] = median[module]
+    print("{}: {:.1f} ms".format(module, median[module] / 1000))
+    heaviest = sorted(
+        (
+            name
+            for name in names
+            if "." not in name and not (module + ".").startswith(name + ".")
+        ),
+        key=lambda name: median[name],
+        reverse=True,
+    )[: args.top]
+    for name in heaviest:
+        print("    {:<40} {:>8.1f} ms".format(name, median[name] / 1000))
+
+if args.record:
+    from pyepsilla.vectordb.version import __version__
+
+    with open(args.record, "a") as file:
+        file.write(
+            json.dumps(
+                {
+                    "time": datetime.datetime.now().isoformat(timespec="seconds"),
+                    "version": __version__,
+                    "python": platform.python_version(),
+                    "runs": args.runs,
+                    "median_us": medians,
+                }
+            )
+            + "\n"
+        )
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# Compare fusion time of the rerankers across candidate list sizes. The retrievers
+# rank one corpus with noise: "high" agreement lets RRF with a limit stop early,
+# "low" agreement makes it fuse the full lists.
+# "python" is the pure Python implementation used when numpy is not installed.
+# python3 benchmark_rerankers.py [retrievers] [limit]
+
+import random
+import sys
+import time
+
+from pyepsilla.utils.search_engine import (
+    DistributionBasedScoreFusionReranker,
+    RelativeScoreFusionReranker,
+    RRFReRanker,
+)
+
+retrievers_num = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+limit = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+random.seed(0)
+
+
+def make_candidates(size, noise):
+    corpus = list(range(size * 2))
+    random.shuffle(corpus)
+    candidates = []
+    for _ in range(retrievers_num):
+        noisy = sorted(range(len(corpus)), key=lambda i: i + random.gauss(0, noise))[
+            :size
+        ]
+        candidates.append(
+            [
+                {"@id": corpus[i], "@distance": rank / size}
+                for rank, i in enumerate(noisy)
+            ]
+        )
+    return candidates
+
+
+def bench(rerank, candidates):
+    repeat = max(1, 20000 // len(candidates[0]))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        rerank(candidates)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+print(
+    "{:<8} {:<10} {:<6} {:>14} {:>14} {:>14}".format(
+        "size",
+        "agreement",
+        "fusion",
+        "python (ms)",
+        "no limit (ms)",
+        "limit={} (ms)".format(limit),
+    )
+)
+for size, agreement in [
+    (size, agreement) for size in [100, 1000, 10000] for agreement in ["high", "low"]
+]:
+    candidates = make_candidates(size, 1 if agreement == "high" else size / 10)
+    for name, make in [
+        ("RRF", lambda limit: RRFReRanker(limit=limit)),
+        ("RSF", lambda limit: RelativeScoreFusionReranker(limit=limit)),
+        (
+            "DBSF",
+            lambda limit: DistributionBasedScoreFusionReranker(
+                [[0, 1]] * retrievers_num, limit=limit
+            ),
+        ),
+    ]:
+        reranker = make(limit)
+        if name == "RRF":
+            python = lambda c: reranker._rerank_python(c, [1] * len(c))
+        else:
+            python = reranker._rerank_python
+        print(
+            "{:<8} {:<10} {:<6} {:>14.3f} {:>14.3f} {:>14.3f}".format(
+                size,
+                agreement,
+                name,
+                bench(python, candidates),
+                bench(make(None).rerank, candidates),
+                bench(reranker.rerank, candidates),
+            )
+        )
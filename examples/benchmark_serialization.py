@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# Compare insert body serialization throughput for 960-dim float32 vectors (gist-960 shape)
+# python3 benchmark_serialization.py [records] [dimensions]
+
+import json
+import sys
+import time
+
+import numpy as np
+from pyepsilla.utils.serializer import JSONSerializer, OrjsonSerializer
+
+records_num = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+dimensions = int(sys.argv[2]) if len(sys.argv) > 2 else 960
+vectors = np.random.rand(records_num, dimensions).astype(np.float32)
+
+
+def bench(name, build, dumps):
+    start = time.perf_counter()
+    body = dumps({"table": "benchmark", "data": build()})
+    elapsed = time.perf_counter() - start
+    print(
+        "{:<40} {:>10.0f} records/s {:>8.1f} MB".format(
+            name, records_num / elapsed, len(body) / 1024 / 1024
+        )
+    )
+
+
+def as_lists():
+    return [{"id": i, "vector": vectors[i].tolist()} for i in range(records_num)]
+
+
+def as_arrays():
+    return [{"id": i, "vector": vectors[i]} for i in range(records_num)]
+
+
+print("{} records x {} dimensions".format(records_num, dimensions))
+bench("before: .tolist() + json.dumps", as_lists, json.dumps)
+bench("after: ndarray + JSONSerializer", as_arrays, JSONSerializer().dumps)
+try:
+    bench("after: ndarray + OrjsonSerializer", as_arrays, OrjsonSerializer().dumps)
+except ValueError as e:
+    print(e)
@@ -7,7 +7,6 @@
 # 3. wget http://ann-benchmarks.com/gist-960-euclidean.hdf5
 # 4. python3 gist-960-euclidean.py
 
-import datetime
 import os
 from urllib.parse import urlparse
 
@@ -40,24 +39,22 @@ vec_field = {"name": "vector", "dataType": "VECTOR_FLOAT", "dimensions": dimensi
 fields = [id_field, vec_field]
 status_code, response = client.create_table(table_name="benchmark", table_fields=fields)
 
-# Insert 20000 data into table
-records_data = [{"id": i, "vector": training_data[i].tolist()} for i in range(10000)]
-client.insert(table_name="benchmark", records=records_data)
-
-# Insert all data into table
-indexs = [i for i in range(0, records_num + 10000, 50000)]
+# Insert all data into table, chunked and sent concurrently
 print("Begin to insert all gist data into table ...")
-for i in range(len(indexs) - 1):
-    print("-" * 20)
-    start = datetime.datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
-    print(indexs[i], indexs[i + 1])
-    records_data = [
-        {"id": i, "vector": training_data[i].tolist()}
-        for i in range(indexs[i], indexs[i + 1])
-    ]
-    client.insert(table_name="benchmark", records=records_data)
-    end = datetime.datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
-    print("START:", start, "\nEND  :", end)
+result = client.bulk_insert(
+    table_name="benchmark",
+    records=({"id": i, "vector": training_data[i]} for i in range(records_num)),
+    chunk_size=10000,
+    # a 960-d vector is ~10KB of JSON, lift the default 8MB cap on chunk size
+    # so that chunks really hold chunk_size records
+    max_chunk_bytes=None,
+    max_workers=4,
+)
+print(
+    "Inserted {} records in {} chunks, {:.1f} records/s".format(
+        result["records"], result["chunks"], result["records_per_second"]
+    )
+)
 
 
 # Delete some data by ids
@@ -70,7 +67,7 @@ client.rebuild()
 
 # Query vectors
 query_field = "vector"
-query_vector = training_data[40000].tolist()
+query_vector = training_data[40000]
 response_fields = ["id"]
 limit = 2
 
@@ -85,7 +82,8 @@ status_code, response = client.query(
 print("Response:", response)
 
 
-# Get
-status_code, body = client.get(table_name="benchmark")
-print("Status Code:", status_code)
-print("Size of result gotten", len(body["result"]))
+# Scan the whole table page by page instead of pulling it in one response
+records_count = 0
+for record in client.iter_records(table_name="benchmark", page_size=10000):
+    records_count += 1
+print("Size of result gotten", records_count)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# Run queries and inserts against a local stand-in server that fails a share of
+# requests with 503 or by dropping the connection, with and without a RetryPolicy.
+# python3 retry_fault_injection.py [requests] [failure_rate]
+
+import json
+import random
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pyepsilla import vectordb
+from pyepsilla.utils import RetryPolicy
+
+requests_num = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+failure_rate = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+random.seed(0)
+
+
+class FaultInjectingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        fault = random.random()
+        if fault < failure_rate / 2:
+            # drop the connection without a response
+            self.close_connection = True
+            return
+        status_code = 503 if fault < failure_rate else 200
+        data = json.dumps({"statusCode": status_code, "result": []}).encode()
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), FaultInjectingHandler)
+server.daemon_threads = True
+threading.Thread(target=server.serve_forever, daemon=True).start()
+port = str(server.server_address[1])
+
+for name, retry in [
+    ("no retry", None),
+    ("retry", RetryPolicy(backoff_base=0.01)),
+    ("retry inserts", RetryPolicy(backoff_base=0.01, retry_inserts=True)),
+]:
+    client = vectordb.Client(host="127.0.0.1", port=port, retry=retry)
+    client.use_db("MyDB")
+    for operation in ["query", "insert"]:
+        failed = 0
+        for _ in range(requests_num):
+            try:
+                if operation == "query":
+                    status_code, _ = client.query("MyTable", query_text="hello")
+                else:
+                    status_code, _ = client.insert("MyTable", [{"ID": 1}])
+            except Exception:
+                status_code = None
+            failed += status_code != 200
+        print("{:<14} {:<7} failed {}/{}".format(name, operation, failed, requests_num))
+    if retry is not None:
+        print(retry.stats())
+    client.close()
+server.shutdown()
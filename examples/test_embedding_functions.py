@@ -12,6 +12,11 @@ default_ef = embedding_functions.DefaultEmbeddingFunction()
 embeddings = default_ef.__call__(sentences)
 print(embeddings)
 
+# Embeddings as a float32 numpy array, rows can be inserted as vector fields directly
+# e.g. client.insert(table_name, [{"ID": i, "Doc": doc, "Embedding": embeddings[i]} for i, doc in enumerate(sentences)])
+embeddings = default_ef.embed_array(sentences)
+print(embeddings.shape, embeddings.dtype)
+
 ## Specific Sentence Transformers model
 ## https://www.sbert.net/docs/pretrained_models.html#sentence-embedding-models/
 sentence_transformer_ef = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2")
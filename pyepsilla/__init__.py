@@ -1,4 +1,21 @@
 #!/usr/bin/env python
 # -*- coding:utf-8 -*-
 
-from . import cloud, enterprise, utils, vectordb
+import importlib
+
+# Subpackages are imported on first attribute access (PEP 562), so importing
+# pyepsilla.vectordb does not pull in the cloud/enterprise clients and their
+# dependencies.
+__all__ = ["cloud", "enterprise", "utils", "vectordb"]
+
+
+def __getattr__(name):
+    if name in __all__:
+        module = importlib.import_module("." + name, __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,8 +1,19 @@
 #!/usr/bin/env python
 # -*- coding:utf-8 -*-
 
+import importlib
+
 from ..utils.rag import RAG
 from .client import Client
 # from .sentry import init_sentry
 
 # init_sentry()
+
+
+# AsyncClient pulls in asyncio, import it on first use
+def __getattr__(name):
+    if name == "AsyncClient":
+        module = importlib.import_module(".async_client", __name__)
+        globals()[name] = module.AsyncClient
+        return module.AsyncClient
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
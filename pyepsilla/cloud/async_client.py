@@ -0,0 +1,351 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+from __future__ import annotations
+
+from typing import Optional, Sequence, Union
+
+
+from ..utils.async_http import AsyncHTTPClient
+from ..utils.batch import async_query_batch
+from ..utils.pagination import async_iter_records
+from ..utils.result_set import RESULT_FORMATS, format_result
+from ..utils.search_engine import SearchEngine
+from ..utils.serializer import Serializer
+
+
+class AsyncClient(AsyncHTTPClient):
+    """asyncio counterpart of cloud.Client, backed by a pooled aiohttp session."""
+
+    def __init__(
+        self,
+        project_id: str,
+        api_key: str,
+        headers: dict = None,
+        proxies: dict = None,
+        connection_limit: int = 100,
+        connection_limit_per_host: int = 0,
+        max_concurrency: int = 100,
+        serializer: Union[str, Serializer] = None,
+    ):
+        self._project_id = project_id
+        self._apikey = api_key
+        self._baseurl = f"https://dispatch.epsilla.com/api/v3/project/{self._project_id}"  # type: ignore
+        header = {"Content-type": "application/json", "X-API-Key": api_key}
+        if headers is not None:
+            header.update(headers)
+        self._db_id = None
+        super().__init__(
+            header,
+            proxies=proxies,
+            connection_limit=connection_limit,
+            connection_limit_per_host=connection_limit_per_host,
+            max_concurrency=max_concurrency,
+            serializer=serializer,
+        )
+
+    def _client_options(self) -> dict:
+        return {
+            "connection_limit": self._connection_limit,
+            "connection_limit_per_host": self._connection_limit_per_host,
+            "max_concurrency": self._max_concurrency,
+            "serializer": self._serializer,
+        }
+
+    async def validate(self):
+        req_url = f"{self._baseurl}/vectordb/list"
+        _, body = await self._request("GET", req_url)
+        return body
+
+    async def get_db_list(self):
+        db_list = []
+        req_url = f"{self._baseurl}/vectordb/list"
+        status_code, body = await self._request("GET", req_url)
+        if status_code == 200 and body["statusCode"] == 200:
+            db_list = [db_id for db_id in body["result"]]
+        return db_list
+
+    async def load_db(self, db_name: str, db_path: str):
+        db_id = db_name.lstrip("db_").replace("_", "-")
+        req_url = f"{self._baseurl}/vectordb/{db_id}/load"
+        return await self._request("POST", req_url)
+
+    def use_db(self, db_name: str):
+        self._db_id = db_name.lstrip("db_").replace("_", "-")
+        return 200, {"statusCode": 200, "message": "", "result": {}}
+
+    async def get_db_info(self, db_id: str):
+        req_url = f"{self._baseurl}/vectordb/{db_id}"
+        return await self._request("GET", req_url)
+
+    async def get_db_statistics(self, db_id: str):
+        req_url = f"{self._baseurl}/vectordb/{db_id}/statistics"
+        return await self._request("GET", req_url)
+
+    async def vectordb(self, db_id: str):
+        # validate project_id and api_key
+        resp = await self.validate()
+        if resp["statusCode"] != 200:
+            if resp["statusCode"] == 404:
+                raise Exception("Invalid project_id")
+            if resp["statusCode"] == 401:
+                raise Exception("Invalid api_key")
+
+        # validate db_id
+        db_list = await self.get_db_list()
+        if db_id not in db_list:
+            raise Exception("Invalid db_id")
+
+        # fetch db public endpoint
+        status_code, resp = await self.get_db_info(db_id=db_id)
+        if resp["statusCode"] == 200:
+            return AsyncVectordb(
+                self._project_id,
+                db_id,
+                self._apikey,
+                resp["result"]["public_endpoint"],
+                self._header,
+                self._proxy,
+                **self._client_options(),
+            )
+        else:
+            print(resp)
+            raise Exception("Failed to get db info")
+
+
+class AsyncVectordb(AsyncClient):
+    """asyncio counterpart of cloud.Vectordb."""
+
+    def __init__(
+        self,
+        project_id: str,
+        db_id: str,
+        api_key: str,
+        public_endpoint: str,
+        headers: dict = None,
+        proxies: dict = None,
+        connection_limit: int = 100,
+        connection_limit_per_host: int = 0,
+        max_concurrency: int = 100,
+        serializer: Union[str, Serializer] = None,
+    ):
+        super().__init__(
+            project_id,
+            api_key,
+            headers=headers,
+            proxies=proxies,
+            connection_limit=connection_limit,
+            connection_limit_per_host=connection_limit_per_host,
+            max_concurrency=max_concurrency,
+            serializer=serializer,
+        )
+        self._db_id = db_id
+        self._public_endpoint = public_endpoint
+        self._baseurl = f"https://{self._public_endpoint}/api/v3/project/{self._project_id}/vectordb/{self._db_id}"
+
+    # List table
+    async def list_tables(self):
+        if self._db_id is None:
+            raise Exception("[ERROR] db_id is None!")
+        req_url = f"{self._baseurl}/table/list"
+        return await self._request("GET", req_url)
+
+    # Create table
+    async def create_table(
+        self,
+        table_name: str,
+        table_fields: list[dict] = None,
+        indices: list[dict] = None,
+    ):
+        if self._db_id is None:
+            raise Exception("[ERROR] db_id is None!")
+        if table_fields is None:
+            table_fields = []
+        req_url = f"{self._baseurl}/table/create"
+        req_data = {"name": table_name, "fields": table_fields}
+        if indices is not None:
+            req_data["indices"] = indices
+        return await self._request("POST", req_url, req_data)
+
+    # Drop table
+    async def drop_table(self, table_name: str):
+        if self._db_id is None:
+            raise Exception("[ERROR] db_id is None!")
+        req_url = f"{self._baseurl}/table/delete?table_name={table_name}"
+        return await self._request("DELETE", req_url, {})
+
+    # Insert data into table
+    async def insert(self, table_name: str, records: list[dict]):
+        req_url = f"{self._baseurl}/data/insert"
+        req_data = {"table": table_name, "data": records}
+        return await self._request("POST", req_url, req_data)
+
+    async def upsert(self, table_name: str, records: list[dict]):
+        req_url = f"{self._baseurl}/data/insert"
+        req_data = {"table": table_name, "data": records, "upsert": True}
+        return await self._request("POST", req_url, req_data)
+
+    # Query data from table
+    async def query(
+        self,
+        table_name: str,
+        query_text: str = None,
+        query_index: str = None,
+        query_field: str = None,
+        query_vector: Union[list, dict] = None,
+        response_fields: Optional[list] = None,
+        limit: int = 2,
+        filter: Optional[str] = None,
+        with_distance: Optional[bool] = False,
+        facets: Optional[list[dict]] = None,
+        result_format: str = "records",
+        primary_key_field: Optional[str] = None,
+    ):
+        if result_format not in RESULT_FORMATS:
+            raise Exception("[ERROR] Invalid result_format: {}".format(result_format))
+        req_url = f"{self._baseurl}/data/query"
+        req_data = {"table": table_name, "limit": limit}
+
+        if response_fields is None:
+            response_fields = []
+
+        if query_text is not None:
+            req_data["query"] = query_text
+        if query_index is not None:
+            req_data["queryIndex"] = query_index
+        if query_field is not None:
+            req_data["queryField"] = query_field
+        if query_vector is not None:
+            req_data["queryVector"] = query_vector
+        if response_fields is not None:
+            req_data["response"] = response_fields
+        if filter is not None:
+            req_data["filter"] = filter
+        if with_distance is not False:
+            req_data["withDistance"] = with_distance
+
+        if facets is not None and len(facets) > 0:
+            for facet in facets:
+                if "aggregate" not in facet:
+                    raise Exception("[ERROR] key aggregate is a must in facets!")
+            req_data["facets"] = facets
+
+        status_code, body = await self._request("POST", req_url, req_data)
+        return status_code, format_result(body, result_format, primary_key_field)
+
+    # Query data from table in a batch
+    async def query_batch(
+        self,
+        table_name: str,
+        query_vectors: Optional[Sequence] = None,
+        query_texts: Optional[list[str]] = None,
+        max_in_flight: int = 64,
+        **kwargs,
+    ):
+        """Run one query per vector/text concurrently, results are returned in input order."""
+        return await async_query_batch(
+            self, table_name, query_vectors, query_texts, max_in_flight, **kwargs
+        )
+
+    # Delete data from table
+    async def delete(
+        self,
+        table_name: str,
+        primary_keys: Optional[list[Union[str, int]]] = None,
+        ids: Optional[list[Union[str, int]]] = None,
+        filter: Optional[str] = None,
+    ):
+        """Epsilla supports delete records by primary keys as default for now."""
+        if filter is None:
+            if primary_keys is None and ids is None:
+                raise Exception(
+                    "[ERROR] Please provide at least one of primary keys(ids) and filter to delete record(s)."
+                )
+        if primary_keys is None and ids is not None:
+            primary_keys = ids
+        if primary_keys is not None and ids is not None:
+            try:
+                import sentry_sdk
+
+                sentry_sdk.sdk("Duplicate Keys with both primary keys and ids", "info")
+            except Exception as e:
+                pass
+            print(
+                "[WARN] Both primary_keys and ids are prvoided, will use primary keys by default!"
+            )
+
+        req_url = f"{self._baseurl}/data/delete"
+        req_data = {"table": table_name}
+        if primary_keys is not None:
+            req_data["primaryKeys"] = primary_keys
+        if filter is not None:
+            req_data["filter"] = filter
+        return await self._request("POST", req_url, req_data)
+
+    # Get data from table
+    async def get(
+        self,
+        table_name: str,
+        response_fields: Optional[list] = None,
+        primary_keys: Optional[list[Union[str, int]]] = None,
+        ids: Optional[list[Union[str, int]]] = None,
+        filter: Optional[str] = None,
+        skip: Optional[int] = None,
+        limit: Optional[int] = None,
+        facets: Optional[list[dict]] = None,
+        result_format: str = "records",
+        primary_key_field: Optional[str] = None,
+    ):
+        """Epsilla supports get records by primary keys as default for now."""
+        if result_format not in RESULT_FORMATS:
+            raise Exception("[ERROR] Invalid result_format: {}".format(result_format))
+        if primary_keys is not None and ids is not None:
+            try:
+                import sentry_sdk
+
+                sentry_sdk.sdk("Duplicate Keys with both primary_keys and ids", "info")
+            except Exception as e:
+                pass
+            print(
+                "[WARN]Both primary_keys and ids are prvoided, will use primary keys by default!"
+            )
+        if primary_keys is None and ids is not None:
+            primary_keys = ids
+
+        req_data = {"table": table_name}
+
+        if response_fields is not None:
+            req_data["response"] = response_fields
+        if primary_keys is not None:
+            req_data["primaryKeys"] = primary_keys
+        if filter is not None:
+            req_data["filter"] = filter
+        if skip is not None:
+            req_data["skip"] = skip
+        if limit is not None:
+            req_data["limit"] = limit
+
+        if facets is not None and len(facets) > 0:
+            for facet in facets:
+                if "aggregate" not in facet:
+                    raise Exception("[ERROR] key aggregate is a must in facets!")
+            req_data["facets"] = facets
+
+        req_url = f"{self._baseurl}/data/get"
+        status_code, body = await self._request("POST", req_url, req_data)
+        return status_code, format_result(body, result_format, primary_key_field)
+
+    def iter_records(
+        self,
+        table_name: str,
+        page_size: int = 1000,
+        response_fields: Optional[list] = None,
+        filter: Optional[str] = None,
+        prefetch: bool = True,
+    ):
+        """Async iterator over all records of a table, fetched page by page."""
+        return async_iter_records(
+            self, table_name, page_size, response_fields, filter, prefetch
+        )
+
+    def as_search_engine(self, **kwargs):
+        return SearchEngine(self, **kwargs)
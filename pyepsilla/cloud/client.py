@@ -3,21 +3,73 @@
 from __future__ import annotations
 
 import json
-from typing import Optional, Union
+import time
+from functools import partial
+from typing import Iterable, Optional, Sequence, Union
 
 import requests
-import sentry_sdk
-from pydantic import BaseModel, Field, constr
 
+from ..utils.batch import query_batch
+from ..utils.bulk import BulkWriter
+from ..utils.cache import QueryCache
+from ..utils.endpoint_cache import EndpointCache, cache_key
+from ..utils.hedge import HEDGED_OPERATIONS, HedgePolicy
+from ..utils.pagination import iter_records
+from ..utils.result_set import RESULT_FORMATS, format_result
+from ..utils.retry import RetryPolicy
 from ..utils.search_engine import SearchEngine
+from ..utils.serializer import Serializer, get_serializer
+from ..utils.streaming import StreamingResponse
 
 requests.packages.urllib3.disable_warnings()
 
+# minimum seconds between endpoint re-resolutions triggered by 401/404 responses
+ENDPOINT_REFRESH_INTERVAL = 30
+
+
+def _endpoint_gone(resp: requests.Response) -> bool:
+    """True if a data plane response says the db is not served at this endpoint."""
+    if resp.status_code == 401:
+        return True
+    if resp.status_code != 404:
+        return False
+    # a missing table (or record) is a 404 from the db itself, which names what
+    # is missing; an endpoint the db moved away from does not answer in JSON
+    # or reports the db itself as missing
+    try:
+        body = resp.json()
+    except ValueError:
+        return True
+    if not isinstance(body, dict):
+        return True
+    message = str(body.get("message", "")).lower()
+    if "table" in message:
+        return False
+    return "db" in message or "database" in message
+
 
 class Client(object):
     def __init__(
-        self, project_id: str, api_key: str, headers: dict = None, proxies: dict = None
+        self,
+        project_id: str,
+        api_key: str,
+        headers: dict = None,
+        proxies: dict = None,
+        serializer: Union[str, Serializer] = None,
+        query_cache: Union[bool, QueryCache] = None,
+        endpoint_cache: Union[bool, EndpointCache] = True,
+        retry: Union[bool, RetryPolicy] = None,
+        hedge: Union[bool, HedgePolicy] = None,
     ):
+        """
+        retry: True or a RetryPolicy to retry calls on transient failures, handles
+            returned by vectordb() share it.
+        hedge: True or a HedgePolicy to hedge slow query/get calls, handles returned
+            by vectordb() share it.
+        endpoint_cache: EndpointCache for the db list and db public endpoints looked up
+            by vectordb(), True uses the process-wide in-memory cache, False disables it.
+            Pass EndpointCache(cache_dir=...) to share lookups between processes.
+        """
         self._project_id = project_id
         self._apikey = api_key
         self._baseurl = f"https://dispatch.epsilla.com/api/v3/project/{self._project_id}"  # type: ignore
@@ -33,16 +85,58 @@ class Client(object):
         if headers is not None:
             self._header.update(headers)
         self._db_id = None
+        self._serializer = get_serializer(serializer)
+        if query_cache is True:
+            query_cache = QueryCache()
+        self._query_cache = query_cache or None
+        if endpoint_cache is True:
+            endpoint_cache = EndpointCache.shared()
+        self._endpoint_cache = endpoint_cache or None
+        if retry is True:
+            retry = RetryPolicy()
+        self._retry = retry or None
+        if hedge is True:
+            hedge = HedgePolicy()
+        self._hedge = hedge or None
+
+    @property
+    def query_cache(self) -> Optional[QueryCache]:
+        return self._query_cache
+
+    @property
+    def retry_policy(self) -> Optional[RetryPolicy]:
+        return self._retry
+
+    @property
+    def hedge_policy(self) -> Optional[HedgePolicy]:
+        return self._hedge
+
+    def _request(
+        self, operation: str, method: str, req_url: str, **kwargs
+    ) -> requests.Response:
+        def send():
+            return requests.request(
+                method,
+                url=req_url,
+                headers=self._header,
+                verify=False,
+                proxies=self._proxy,
+                **kwargs,
+            )
+
+        if (
+            self._hedge is not None
+            and operation in HEDGED_OPERATIONS
+            and not kwargs.get("stream")
+        ):
+            send = partial(self._hedge.call, send)
+        if self._retry is None:
+            return send()
+        return self._retry.call(operation, send)
 
     def validate(self):
         req_url = f"{self._baseurl}/vectordb/list"
-        resp = requests.get(
-            url=req_url,
-            data=None,
-            headers=self._header,
-            verify=False,
-            proxies=self._proxy,
-        )
+        resp = self._request("validate", "get", req_url, data=None)
         data = resp.json()
         resp.close()
         del resp
@@ -51,13 +145,7 @@ class Client(object):
     def get_db_list(self):
         db_list = []
         req_url = f"{self._baseurl}/vectordb/list"
-        resp = requests.get(
-            url=req_url,
-            data=None,
-            headers=self._header,
-            verify=False,
-            proxies=self._proxy,
-        )
+        resp = self._request("get_db_list", "get", req_url, data=None)
         status_code = resp.status_code
         body = resp.json()
         if status_code == 200 and body["statusCode"] == 200:
@@ -69,13 +157,7 @@ class Client(object):
     def load_db(self, db_name: str, db_path: str):
         db_id = db_name.lstrip("db_").replace("_", "-")
         req_url = f"{self._baseurl}/vectordb/{db_id}/load"
-        resp = requests.post(
-            url=req_url,
-            data=None,
-            headers=self._header,
-            verify=False,
-            proxies=self._proxy,
-        )
+        resp = self._request("load_db", "post", req_url, data=None)
         status_code = resp.status_code
         body = resp.json()
         resp.close()
@@ -88,13 +170,7 @@ class Client(object):
 
     def get_db_info(self, db_id: str):
         req_url = f"{self._baseurl}/vectordb/{db_id}"
-        resp = requests.get(
-            url=req_url,
-            data=None,
-            headers=self._header,
-            verify=False,
-            proxies=self._proxy,
-        )
+        resp = self._request("get_db_info", "get", req_url, data=None)
         status_code = resp.status_code
         body = resp.json()
         resp.close()
@@ -104,12 +180,8 @@ class Client(object):
     def get_db_statistics(self, db_id: str):
         req_url = f"{self._baseurl}/vectordb/{db_id}/statistics"
         req_data = None
-        resp = requests.get(
-            url=req_url,
-            data=json.dumps(req_data),
-            headers=self._header,
-            verify=False,
-            proxies=self._proxy,
+        resp = self._request(
+            "get_db_statistics", "get", req_url, data=self._serializer.dumps(req_data)
         )
         status_code = resp.status_code
         body = resp.json()
@@ -118,30 +190,60 @@ class Client(object):
         return status_code, body
 
     def vectordb(self, db_id: str):
-        # validate project_id and api_key
-        resp = self.validate()
-        if resp["statusCode"] != 200:
-            if resp["statusCode"] == 404:
-                raise Exception("Invalid project_id")
-            if resp["statusCode"] == 401:
-                raise Exception("Invalid api_key")
+        return Vectordb(
+            self._project_id,
+            db_id,
+            self._apikey,
+            self.resolve_endpoint(db_id),
+            self._header,
+            self._proxy,
+            self._serializer,
+            self._query_cache,
+            resolver=self,
+            retry=self._retry,
+            hedge=self._hedge,
+        )
+
+    # Resolve db public endpoint, from the endpoint cache when possible
+    def resolve_endpoint(self, db_id: str, refresh: bool = False) -> str:
+        cache = self._endpoint_cache
+        list_key = cache_key(self._project_id, self._apikey, "db_list")
+        endpoint_key = cache_key(self._project_id, self._apikey, "db", db_id)
+        if cache is not None:
+            if refresh:
+                cache.invalidate(list_key)
+                cache.invalidate(endpoint_key)
+            else:
+                public_endpoint = cache.get(endpoint_key)
+                if public_endpoint is not None:
+                    return public_endpoint
+
+        # validate project_id and api_key, the response is the db list
+        db_list = cache.get(list_key) if cache is not None and not refresh else None
+        if db_list is None:
+            resp = self.validate()
+            if resp["statusCode"] != 200:
+                if resp["statusCode"] == 404:
+                    raise Exception("Invalid project_id")
+                if resp["statusCode"] == 401:
+                    raise Exception("Invalid api_key")
+                db_list = []
+            else:
+                db_list = [db_id for db_id in resp["result"]]
+                if cache is not None:
+                    cache.put(list_key, db_list)
 
         # validate db_id
-        db_list = self.get_db_list()
         if db_id not in db_list:
             raise Exception("Invalid db_id")
 
         # fetch db public endpoint
         status_code, resp = self.get_db_info(db_id=db_id)
         if resp["statusCode"] == 200:
-            return Vectordb(
-                self._project_id,
-                db_id,
-                self._apikey,
-                resp["result"]["public_endpoint"],
-                self._header,
-                self._proxy,
-            )
+            public_endpoint = resp["result"]["public_endpoint"]
+            if cache is not None:
+                cache.put(endpoint_key, public_endpoint)
+            return public_endpoint
         else:
             print(resp)
             del resp
@@ -157,7 +259,18 @@ class Vectordb(Client):
         public_endpoint: str,
         headers: dict = None,
         proxies: dict = None,
+        serializer: Union[str, Serializer] = None,
+        query_cache: Union[bool, QueryCache] = None,
+        resolver: Client = None,
+        retry: Union[bool, RetryPolicy] = None,
+        hedge: Union[bool, HedgePolicy] = None,
     ):
+        """
+        resolver: cloud Client that resolved public_endpoint, used to look the endpoint
+            up again when the data plane answers 401, or 404 for the db itself.
+        retry: True or a RetryPolicy to retry calls on transient failures.
+        hedge: True or a HedgePolicy to hedge slow query/get calls.
+        """
         self._project_id = project_id
         self._db_id = db_id
         self._api_key = api_key
@@ -169,15 +282,58 @@ class Vectordb(Client):
             self._proxy = proxies
         if headers is not None:
             self._header.update(headers)
+        self._serializer = get_serializer(serializer)
+        if query_cache is True:
+            query_cache = QueryCache()
+        self._query_cache = query_cache or None
+        self._resolver = resolver
+        self._last_refresh = None
+        if retry is True:
+            retry = RetryPolicy()
+        self._retry = retry or None
+        if hedge is True:
+            hedge = HedgePolicy()
+        self._hedge = hedge or None
+
+    def _refresh_endpoint(self) -> bool:
+        """Re-resolve the public endpoint, returns True if it moved."""
+        if self._resolver is None:
+            return False
+        now = time.monotonic()
+        if (
+            self._last_refresh is not None
+            and now - self._last_refresh < ENDPOINT_REFRESH_INTERVAL
+        ):
+            return False
+        self._last_refresh = now
+        try:
+            public_endpoint = self._resolver.resolve_endpoint(self._db_id, refresh=True)
+        except Exception as e:
+            print("[WARN] Failed to refresh db endpoint: {}".format(e))
+            return False
+        if public_endpoint == self._public_endpoint:
+            return False
+        self._public_endpoint = public_endpoint
+        self._baseurl = f"https://{self._public_endpoint}/api/v3/project/{self._project_id}/vectordb/{self._db_id}"
+        return True
+
+    def _request(
+        self, operation: str, method: str, req_url: str, **kwargs
+    ) -> requests.Response:
+        path = req_url.split(f"/vectordb/{self._db_id}", 1)[1]
+        resp = super()._request(operation, method, req_url, **kwargs)
+        # a moved or recreated db answers 401/404 on its old endpoint
+        if _endpoint_gone(resp) and self._refresh_endpoint():
+            resp.close()
+            resp = super()._request(operation, method, self._baseurl + path, **kwargs)
+        return resp
 
     # List table
     def list_tables(self):
         if self._db_id is None:
             raise Exception("[ERROR] db_id is None!")
         req_url = f"{self._baseurl}/table/list"
-        resp = requests.get(
-            url=req_url, headers=self._header, verify=False, proxies=self._proxy
-        )
+        resp = self._request("list_tables", "get", req_url)
         status_code = resp.status_code
         body = resp.json()
         resp.close()
@@ -199,12 +355,11 @@ class Vectordb(Client):
         req_data = {"name": table_name, "fields": table_fields}
         if indices is not None:
             req_data["indices"] = indices
-        resp = requests.post(
-            url=req_url,
-            data=json.dumps(req_data),
-            headers=self._header,
-            verify=False,
-            proxies=self._proxy,
+        resp = self._request(
+            "create_table",
+            "post",
+            req_url,
+            data=self._serializer.dumps(req_data),
         )
         status_code = resp.status_code
         body = resp.json()
@@ -218,13 +373,14 @@ class Vectordb(Client):
             raise Exception("[ERROR] db_id is None!")
         req_url = f"{self._baseurl}/table/delete?table_name={table_name}"
         req_data = {}
-        resp = requests.delete(
-            url=req_url,
-            data=json.dumps(req_data),
-            headers=self._header,
-            verify=False,
-            proxies=self._proxy,
+        resp = self._request(
+            "drop_table",
+            "delete",
+            req_url,
+            data=self._serializer.dumps(req_data),
         )
+        if self._query_cache is not None:
+            self._query_cache.invalidate(table_name)
         status_code = resp.status_code
         body = resp.json()
         resp.close()
@@ -235,13 +391,14 @@ class Vectordb(Client):
     def insert(self, table_name: str, records: list[dict]):
         req_url = f"{self._baseurl}/data/insert"
         req_data = {"table": table_name, "data": records}
-        resp = requests.post(
-            url=req_url,
-            data=json.dumps(req_data),
-            headers=self._header,
-            verify=False,
-            proxies=self._proxy,
+        resp = self._request(
+            "insert",
+            "post",
+            req_url,
+            data=self._serializer.dumps(req_data),
         )
+        if self._query_cache is not None:
+            self._query_cache.invalidate(table_name)
         status_code = resp.status_code
         body = resp.json()
         resp.close()
@@ -251,19 +408,28 @@ class Vectordb(Client):
     def upsert(self, table_name: str, records: list[dict]):
         req_url = f"{self._baseurl}/data/insert"
         req_data = {"table": table_name, "data": records, "upsert": True}
-        resp = requests.post(
-            url=req_url,
-            data=json.dumps(req_data),
-            headers=self._header,
-            verify=False,
-            proxies=self._proxy,
+        resp = self._request(
+            "upsert",
+            "post",
+            req_url,
+            data=self._serializer.dumps(req_data),
         )
+        if self._query_cache is not None:
+            self._query_cache.invalidate(table_name)
         status_code = resp.status_code
         body = resp.json()
         resp.close()
         del resp
         return status_code, body
 
+    def bulk_insert(self, table_name: str, records: Iterable[dict], **kwargs):
+        """Insert an iterable of records in concurrent chunks, see utils.bulk.BulkWriter for options."""
+        return BulkWriter(self, **kwargs).write(table_name, records)
+
+    def bulk_upsert(self, table_name: str, records: Iterable[dict], **kwargs):
+        """Upsert an iterable of records in concurrent chunks, see utils.bulk.BulkWriter for options."""
+        return BulkWriter(self, **kwargs).write(table_name, records, upsert=True)
+
     # Query data from table
     def query(
         self,
@@ -277,7 +443,16 @@ class Vectordb(Client):
         filter: Optional[str] = None,
         with_distance: Optional[bool] = False,
         facets: Optional[list[dict]] = None,
+        stream: bool = False,
+        result_format: str = "records",
+        primary_key_field: Optional[str] = None,
     ):
+        if result_format not in RESULT_FORMATS:
+            raise Exception("[ERROR] Invalid result_format: {}".format(result_format))
+        if stream and result_format != "records":
+            raise Exception(
+                "[ERROR] stream=True only supports result_format='records'!"
+            )
         req_url = f"{self._baseurl}/data/query"
         req_data = {"table": table_name, "limit": limit}
 
@@ -309,18 +484,51 @@ class Vectordb(Client):
             else:
                 req_data["facets"] = facets
 
-        resp = requests.post(
-            url=req_url,
-            data=json.dumps(req_data),
-            headers=self._header,
-            verify=False,
-            proxies=self._proxy,
+        data = self._serializer.dumps(req_data)
+        cache_key = None
+        if self._query_cache is not None and not stream:
+            cache_key = (req_url, data)
+            cached = self._query_cache.get(cache_key)
+            if cached is not None:
+                status_code, content = cached
+                body = json.loads(content)
+                return status_code, format_result(
+                    body, result_format, primary_key_field
+                )
+            generation = self._query_cache.generation(table_name)
+
+        resp = self._request(
+            "query",
+            "post",
+            req_url,
+            data=data,
+            stream=stream,
         )
+        if stream:
+            return resp.status_code, StreamingResponse(resp)
         status_code = resp.status_code
         body = resp.json()
+        if cache_key is not None and status_code == 200:
+            self._query_cache.put(
+                cache_key, table_name, (status_code, resp.content), generation
+            )
         resp.close()
         del resp
-        return status_code, body
+        return status_code, format_result(body, result_format, primary_key_field)
+
+    # Query data from table in a batch
+    def query_batch(
+        self,
+        table_name: str,
+        query_vectors: Optional[Sequence] = None,
+        query_texts: Optional[list[str]] = None,
+        max_in_flight: int = 8,
+        **kwargs,
+    ):
+        """Run one query per vector/text concurrently, results are returned in input order."""
+        return query_batch(
+            self, table_name, query_vectors, query_texts, max_in_flight, **kwargs
+        )
 
     # Delete data from table
     def delete(
@@ -340,6 +548,8 @@ class Vectordb(Client):
             primary_keys = ids
         if primary_keys is not None and ids is not None:
             try:
+                import sentry_sdk
+
                 sentry_sdk.sdk("Duplicate Keys with both primary keys and ids", "info")
             except Exception as e:
                 pass
@@ -354,13 +564,14 @@ class Vectordb(Client):
         if filter is not None:
             req_data["filter"] = filter
 
-        resp = requests.post(
-            url=req_url,
-            data=json.dumps(req_data),
-            headers=self._header,
-            verify=False,
-            proxies=self._proxy,
+        resp = self._request(
+            "delete",
+            "post",
+            req_url,
+            data=self._serializer.dumps(req_data),
         )
+        if self._query_cache is not None:
+            self._query_cache.invalidate(table_name)
         status_code = resp.status_code
         body = resp.json()
         resp.close()
@@ -378,10 +589,21 @@ class Vectordb(Client):
         skip: Optional[int] = None,
         limit: Optional[int] = None,
         facets: Optional[list[dict]] = None,
+        stream: bool = False,
+        result_format: str = "records",
+        primary_key_field: Optional[str] = None,
     ):
         """Epsilla supports get records by primary keys as default for now."""
+        if result_format not in RESULT_FORMATS:
+            raise Exception("[ERROR] Invalid result_format: {}".format(result_format))
+        if stream and result_format != "records":
+            raise Exception(
+                "[ERROR] stream=True only supports result_format='records'!"
+            )
         if primary_keys is not None and ids is not None:
             try:
+                import sentry_sdk
+
                 sentry_sdk.sdk("Duplicate Keys with both primary_keys and ids", "info")
             except Exception as e:
                 pass
@@ -415,18 +637,33 @@ class Vectordb(Client):
                 req_data["facets"] = facets
 
         req_url = f"{self._baseurl}/data/get"
-        resp = requests.post(
-            url=req_url,
-            data=json.dumps(req_data),
-            headers=self._header,
-            verify=False,
-            proxies=self._proxy,
+        resp = self._request(
+            "get",
+            "post",
+            req_url,
+            data=self._serializer.dumps(req_data),
+            stream=stream,
         )
+        if stream:
+            return resp.status_code, StreamingResponse(resp)
         status_code = resp.status_code
         body = resp.json()
         resp.close()
         del resp
-        return status_code, body
+        return status_code, format_result(body, result_format, primary_key_field)
+
+    def iter_records(
+        self,
+        table_name: str,
+        page_size: int = 1000,
+        response_fields: Optional[list] = None,
+        filter: Optional[str] = None,
+        prefetch: bool = True,
+    ):
+        """Iterate over all records of a table, fetched page by page."""
+        return iter_records(
+            self, table_name, page_size, response_fields, filter, prefetch
+        )
 
-    def as_search_engine(self):
-        return SearchEngine(self)
+    def as_search_engine(self, **kwargs):
+        return SearchEngine(self, **kwargs)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+from __future__ import annotations
+
+from typing import Optional, Union
+
+from ..cloud import async_client as cloud_async
+from ..utils.async_http import AsyncHTTPClient
+from ..utils.serializer import Serializer
+
+
+class AsyncClient(cloud_async.AsyncClient):
+    """asyncio counterpart of enterprise.Client, backed by a pooled aiohttp session."""
+
+    def __init__(
+        self,
+        base_url: str,
+        project_id: Optional[str] = "default",
+        headers: dict = None,
+        connection_limit: int = 100,
+        connection_limit_per_host: int = 0,
+        max_concurrency: int = 100,
+        serializer: Union[str, Serializer] = None,
+    ):
+        self._project_id = project_id
+        self._baseurl = f"{base_url}/api/v3/project/{project_id}"
+        header = {"Content-type": "application/json", "accept": "application/json"}
+        if headers is not None:
+            header.update(headers)
+        self._db = None
+        AsyncHTTPClient.__init__(
+            self,
+            header,
+            connection_limit=connection_limit,
+            connection_limit_per_host=connection_limit_per_host,
+            max_concurrency=max_concurrency,
+            serializer=serializer,
+        )
+
+    # Get DB List
+    async def get_db_list(self):
+        db_list = []
+        req_url = "{}/vectordb/list".format(self._baseurl)
+        status_code, body = await self._request("GET", req_url)
+        if status_code == 200 and body["statusCode"] == 200:
+            db_list = body["result"]["uuids"]
+        return db_list
+
+    # Get DB Information by db_id
+    async def get_db_info(self, db_id: str):
+        req_url = "{}/vectordb/{}".format(self._baseurl, db_id)
+        return await self._request("GET", req_url)
+
+    # Connect to DB
+    async def vectordb(self, db_id: str):
+        # validate db_id
+        if db_id not in await self.get_db_list():
+            raise Exception("Invalid db_id")
+
+        status_code, resp = await self.get_db_info(db_id=db_id)
+        if resp["statusCode"] == 200:
+            return AsyncVectordb(
+                self._baseurl, db_id, self._header, **self._client_options()
+            )
+        else:
+            print(resp)
+            raise Exception("Failed to get db info")
+
+    # Create DB
+    async def create_db(
+        self,
+        db_name: str,
+        db_id: Optional[str] = None,
+        project_id: Optional[str] = "default",
+        min_replicas: Optional[int] = 0,
+        max_replicas: Optional[int] = 1,
+        sharding_init_number: Optional[int] = 1,
+        sharding_increase_step: Optional[int] = 2,
+        sharding_capacity: Optional[int] = 150000,
+        sharding_increase_threshold: Optional[float] = 0.9,
+    ):
+        req_url = "{}/vectordb/create".format(self._baseurl)
+        req_data = {
+            "db_name": db_name,
+            "db_uuid": db_id,
+            "project_id": project_id,
+            "min_replicas": min_replicas,
+            "max_replicas": max_replicas,
+            "sharding_init_number": sharding_init_number,
+            "sharding_increase_step": sharding_increase_step,
+            "sharding_capacity": sharding_capacity,
+            "sharding_increase_threshold": sharding_increase_threshold,
+        }
+        return await self._request("POST", req_url, req_data)
+
+    # Load DB
+    async def load_db(self, db_id: str):
+        req_url = "{}/vectordb/{}/load".format(self._baseurl, db_id)
+        return await self._request("POST", req_url, {})
+
+    # Unload DB
+    async def unload_db(self, db_id: str):
+        req_url = "{}/vectordb/{}/unload".format(self._baseurl, db_id)
+        return await self._request("POST", req_url, {})
+
+    # Delete DB
+    async def drop_db(self, db_id: str):
+        req_url = "{}/vectordb/{}".format(self._baseurl, db_id)
+        return await self._request("DELETE", req_url, {})
+
+
+class AsyncVectordb(cloud_async.AsyncVectordb):
+    """asyncio counterpart of enterprise.Vectordb."""
+
+    def __init__(
+        self,
+        project_url: str,
+        db_id: str,
+        header: dict,
+        connection_limit: int = 100,
+        connection_limit_per_host: int = 0,
+        max_concurrency: int = 100,
+        serializer: Union[str, Serializer] = None,
+    ):
+        self._db_id = db_id
+        self._baseurl = "{}/vectordb/{}".format(project_url, db_id)
+        AsyncHTTPClient.__init__(
+            self,
+            header,
+            connection_limit=connection_limit,
+            connection_limit_per_host=connection_limit_per_host,
+            max_concurrency=max_concurrency,
+            serializer=serializer,
+        )
+
+    # Insert data into table
+    async def insert(self, table_name: str, records: list[dict] = None):
+        if self._db_id is None:
+            raise Exception("[ERROR] db_id is None!")
+        if records is None:
+            records = []
+        return await super().insert(table_name, records)
+
+    async def upsert(self, table_name: str, records: list[dict] = None):
+        if self._db_id is None:
+            raise Exception("[ERROR] db_id is None!")
+        if records is None:
+            records = []
+        return await super().upsert(table_name, records)
@@ -3,13 +3,22 @@
 from __future__ import annotations
 
 import json
-from typing import Optional, Union
+from functools import partial
+from typing import Iterable, Optional, Sequence, Union
 
 import requests
-import sentry_sdk
 from pydantic import BaseModel, Field, constr
 
+from ..utils.batch import query_batch
+from ..utils.bulk import BulkWriter
+from ..utils.cache import QueryCache
+from ..utils.hedge import HEDGED_OPERATIONS, HedgePolicy
+from ..utils.pagination import iter_records
+from ..utils.result_set import RESULT_FORMATS, format_result
+from ..utils.retry import RetryPolicy
 from ..utils.search_engine import SearchEngine
+from ..utils.serializer import Serializer, get_serializer
+from ..utils.streaming import StreamingResponse
 
 requests.packages.urllib3.disable_warnings()  # type: ignore
 
@@ -25,8 +34,21 @@ class DbModel(BaseModel):
 
 class Client(cloud.Client):
     def __init__(
-        self, base_url: str, project_id: Optional[str] = "default", headers: dict = None
+        self,
+        base_url: str,
+        project_id: Optional[str] = "default",
+        headers: dict = None,
+        serializer: Union[str, Serializer] = None,
+        query_cache: Union[bool, QueryCache] = None,
+        retry: Union[bool, RetryPolicy] = None,
+        hedge: Union[bool, HedgePolicy] = None,
     ):
+        """
+        retry: True or a RetryPolicy to retry calls on transient failures, handles
+            returned by vectordb() share it.
+        hedge: True or a HedgePolicy to hedge slow query/get calls, handles returned
+            by vectordb() share it.
+        """
         self._project_id = project_id
         self._baseurl = f"{base_url}/api/v3/project/{project_id}"
         self._timeout = 10
@@ -38,6 +60,34 @@ class Client(cloud.Client):
         if headers is not None:
             self._header.update(headers)
         self._db = None
+        self._serializer = get_serializer(serializer)
+        if query_cache is True:
+            query_cache = QueryCache()
+        self._query_cache = query_cache or None
+        if retry is True:
+            retry = RetryPolicy()
+        self._retry = retry or None
+        if hedge is True:
+            hedge = HedgePolicy()
+        self._hedge = hedge or None
+
+    def _request(
+        self, operation: str, method: str, req_url: str, **kwargs
+    ) -> requests.Response:
+        def send():
+            return requests.request(
+                method, url=req_url, headers=self._header, verify=False, **kwargs
+            )
+
+        if (
+            self._hedge is not None
+            and operation in HEDGED_OPERATIONS
+            and not kwargs.get("stream")
+        ):
+            send = partial(self._hedge.call, send)
+        if self._retry is None:
+            return send()
+        return self._retry.call(operation, send)
 
     def hello(self):
         print("Hello Epsilla Enterprise!")
@@ -46,7 +96,7 @@ class Client(cloud.Client):
     def get_db_list(self):
         db_list = []
         req_url = "{}/vectordb/list".format(self._baseurl)
-        resp = requests.get(url=req_url, data=None, headers=self._header, verify=False)
+        resp = self._request("get_db_list", "get", req_url, data=None)
         status_code = resp.status_code
         body = resp.json()
         if status_code == 200 and body["statusCode"] == 200:
@@ -58,7 +108,7 @@ class Client(cloud.Client):
     # Get DB Information by db_id
     def get_db_info(self, db_id: str):
         req_url = "{}/vectordb/{}".format(self._baseurl, db_id)
-        resp = requests.get(url=req_url, data=None, headers=self._header, verify=False)
+        resp = self._request("get_db_info", "get", req_url, data=None)
         status_code = resp.status_code
         body = resp.json()
         resp.close()
@@ -73,7 +123,15 @@ class Client(cloud.Client):
 
         status_code, resp = self.get_db_info(db_id=db_id)
         if resp["statusCode"] == 200:
-            return Vectordb(self._baseurl, db_id, self._header)
+            return Vectordb(
+                self._baseurl,
+                db_id,
+                self._header,
+                self._serializer,
+                self._query_cache,
+                self._retry,
+                self._hedge,
+            )
         else:
             print(resp)
             raise Exception("Failed to get db info")
@@ -103,11 +161,8 @@ class Client(cloud.Client):
             "sharding_capacity": sharding_capacity,
             "sharding_increase_threshold": sharding_increase_threshold,
         }
-        resp = requests.post(
-            url=req_url,
-            data=json.dumps(req_data),
-            headers=self._header,
-            verify=False,
+        resp = self._request(
+            "create_db", "post", req_url, data=self._serializer.dumps(req_data)
         )
         status_code = resp.status_code
         body = resp.json()
@@ -119,11 +174,8 @@ class Client(cloud.Client):
     def load_db(self, db_id: str):
         req_url = "{}/vectordb/{}/load".format(self._baseurl, db_id)
         req_data = {}
-        resp = requests.post(
-            url=req_url,
-            data=json.dumps(req_data),
-            headers=self._header,
-            verify=False,
+        resp = self._request(
+            "load_db", "post", req_url, data=self._serializer.dumps(req_data)
         )
         status_code = resp.status_code
         body = resp.json()
@@ -135,11 +187,8 @@ class Client(cloud.Client):
     def unload_db(self, db_id: str):
         req_url = "{}/vectordb/{}/unload".format(self._baseurl, db_id)
         req_data = {}
-        resp = requests.post(
-            url=req_url,
-            data=json.dumps(req_data),
-            headers=self._header,
-            verify=False,
+        resp = self._request(
+            "unload_db", "post", req_url, data=self._serializer.dumps(req_data)
         )
         status_code = resp.status_code
         body = resp.json()
@@ -151,11 +200,8 @@ class Client(cloud.Client):
     def drop_db(self, db_id: str):
         req_url = "{}/vectordb/{}".format(self._baseurl, db_id)
         req_data = {}
-        resp = requests.delete(
-            url=req_url,
-            data=json.dumps(req_data),
-            headers=self._header,
-            verify=False,
+        resp = self._request(
+            "drop_db", "delete", req_url, data=self._serializer.dumps(req_data)
         )
         status_code = resp.status_code
         body = resp.json()
@@ -164,17 +210,47 @@ class Client(cloud.Client):
 
 
 class Vectordb(object):
-    def __init__(self, project_url: str, db_id: str, header: dict):
+    def __init__(
+        self,
+        project_url: str,
+        db_id: str,
+        header: dict,
+        serializer: Union[str, Serializer] = None,
+        query_cache: Union[bool, QueryCache] = None,
+        retry: Union[bool, RetryPolicy] = None,
+        hedge: Union[bool, HedgePolicy] = None,
+    ):
         self._db_id = db_id
         self._baseurl = "{}/vectordb/{}".format(project_url, db_id)
         self._header = header
+        self._serializer = get_serializer(serializer)
+        if query_cache is True:
+            query_cache = QueryCache()
+        self._query_cache = query_cache or None
+        if retry is True:
+            retry = RetryPolicy()
+        self._retry = retry or None
+        if hedge is True:
+            hedge = HedgePolicy()
+        self._hedge = hedge or None
+
+    @property
+    def retry_policy(self) -> Optional[RetryPolicy]:
+        return self._retry
+
+    @property
+    def hedge_policy(self) -> Optional[HedgePolicy]:
+        return self._hedge
+
+    # same request path as Client, it only uses the header and the retry/hedge policies
+    _request = Client._request
 
     # List table
     def list_tables(self):
         if self._db_id is None:
             raise Exception("[ERROR] db_id is None!")
         req_url = "{}/table/list".format(self._baseurl)
-        resp = requests.get(url=req_url, headers=self._header, verify=False)
+        resp = self._request("list_tables", "get", req_url)
         status_code = resp.status_code
         body = resp.json()
         resp.close()
@@ -195,8 +271,8 @@ class Vectordb(object):
         req_data = {"name": table_name, "fields": table_fields}
         if indices is not None:
             req_data["indices"] = indices
-        resp = requests.post(
-            url=req_url, data=json.dumps(req_data), headers=self._header, verify=False
+        resp = self._request(
+            "create_table", "post", req_url, data=self._serializer.dumps(req_data)
         )
         status_code = resp.status_code
         body = resp.json()
@@ -210,9 +286,11 @@ class Vectordb(object):
             raise Exception("[ERROR] db_id is None!")
         req_url = "{}/table/delete?table_name={}".format(self._baseurl, table_name)
         req_data = {}
-        resp = requests.delete(
-            url=req_url, data=json.dumps(req_data), headers=self._header, verify=False
+        resp = self._request(
+            "drop_table", "delete", req_url, data=self._serializer.dumps(req_data)
         )
+        if self._query_cache is not None:
+            self._query_cache.invalidate(table_name)
         status_code = resp.status_code
         body = resp.json()
         resp.close()
@@ -227,9 +305,11 @@ class Vectordb(object):
             records = []
         req_url = "{}/data/insert".format(self._baseurl)
         req_data = {"table": table_name, "data": records}
-        resp = requests.post(
-            url=req_url, data=json.dumps(req_data), headers=self._header, verify=False
+        resp = self._request(
+            "insert", "post", req_url, data=self._serializer.dumps(req_data)
         )
+        if self._query_cache is not None:
+            self._query_cache.invalidate(table_name)
         status_code = resp.status_code
         body = resp.json()
         resp.close()
@@ -243,15 +323,29 @@ class Vectordb(object):
             records = []
         req_url = "{}/data/insert".format(self._baseurl)
         req_data = {"table": table_name, "data": records, "upsert": True}
-        resp = requests.post(
-            url=req_url, data=json.dumps(req_data), headers=self._header, verify=False
+        resp = self._request(
+            "upsert", "post", req_url, data=self._serializer.dumps(req_data)
         )
+        if self._query_cache is not None:
+            self._query_cache.invalidate(table_name)
         status_code = resp.status_code
         body = resp.json()
         resp.close()
         del resp
         return status_code, body
 
+    def bulk_insert(self, table_name: str, records: Iterable[dict], **kwargs):
+        """Insert an iterable of records in concurrent chunks, see utils.bulk.BulkWriter for options."""
+        if self._db_id is None:
+            raise Exception("[ERROR] db_id is None!")
+        return BulkWriter(self, **kwargs).write(table_name, records)
+
+    def bulk_upsert(self, table_name: str, records: Iterable[dict], **kwargs):
+        """Upsert an iterable of records in concurrent chunks, see utils.bulk.BulkWriter for options."""
+        if self._db_id is None:
+            raise Exception("[ERROR] db_id is None!")
+        return BulkWriter(self, **kwargs).write(table_name, records, upsert=True)
+
     # Query data from table
     def query(
         self,
@@ -265,7 +359,16 @@ class Vectordb(object):
         filter: Optional[str] = None,
         with_distance: Optional[bool] = False,
         facets: Optional[list[dict]] = None,
+        stream: bool = False,
+        result_format: str = "records",
+        primary_key_field: Optional[str] = None,
     ):
+        if result_format not in RESULT_FORMATS:
+            raise Exception("[ERROR] Invalid result_format: {}".format(result_format))
+        if stream and result_format != "records":
+            raise Exception(
+                "[ERROR] stream=True only supports result_format='records'!"
+            )
         req_url = "{}/data/query".format(self._baseurl)
         req_data = {"table": table_name, "limit": limit}
 
@@ -297,14 +400,45 @@ class Vectordb(object):
             else:
                 req_data["facets"] = facets
 
-        resp = requests.post(
-            url=req_url, data=json.dumps(req_data), headers=self._header, verify=False
-        )
+        data = self._serializer.dumps(req_data)
+        cache_key = None
+        if self._query_cache is not None and not stream:
+            cache_key = (req_url, data)
+            cached = self._query_cache.get(cache_key)
+            if cached is not None:
+                status_code, content = cached
+                body = json.loads(content)
+                return status_code, format_result(
+                    body, result_format, primary_key_field
+                )
+            generation = self._query_cache.generation(table_name)
+
+        resp = self._request("query", "post", req_url, data=data, stream=stream)
+        if stream:
+            return resp.status_code, StreamingResponse(resp)
         status_code = resp.status_code
         body = resp.json()
+        if cache_key is not None and status_code == 200:
+            self._query_cache.put(
+                cache_key, table_name, (status_code, resp.content), generation
+            )
         resp.close()
         del resp
-        return status_code, body
+        return status_code, format_result(body, result_format, primary_key_field)
+
+    # Query data from table in a batch
+    def query_batch(
+        self,
+        table_name: str,
+        query_vectors: Optional[Sequence] = None,
+        query_texts: Optional[list[str]] = None,
+        max_in_flight: int = 8,
+        **kwargs,
+    ):
+        """Run one query per vector/text concurrently, results are returned in input order."""
+        return query_batch(
+            self, table_name, query_vectors, query_texts, max_in_flight, **kwargs
+        )
 
     # Delete data from table
     def delete(
@@ -324,6 +458,8 @@ class Vectordb(object):
             primary_keys = ids
         if primary_keys is not None and ids is not None:
             try:
+                import sentry_sdk
+
                 sentry_sdk.sdk("Duplicate Keys with both primary keys and ids", "info")
             except Exception as e:
                 pass
@@ -338,9 +474,11 @@ class Vectordb(object):
         if filter is not None:
             req_data["filter"] = filter
 
-        resp = requests.post(
-            url=req_url, data=json.dumps(req_data), headers=self._header, verify=False
+        resp = self._request(
+            "delete", "post", req_url, data=self._serializer.dumps(req_data)
         )
+        if self._query_cache is not None:
+            self._query_cache.invalidate(table_name)
         status_code = resp.status_code
         body = resp.json()
         resp.close()
@@ -358,10 +496,21 @@ class Vectordb(object):
         skip: Optional[int] = None,
         limit: Optional[int] = None,
         facets: Optional[list[dict]] = None,
+        stream: bool = False,
+        result_format: str = "records",
+        primary_key_field: Optional[str] = None,
     ):
         """Epsilla supports get records by primary keys as default for now."""
+        if result_format not in RESULT_FORMATS:
+            raise Exception("[ERROR] Invalid result_format: {}".format(result_format))
+        if stream and result_format != "records":
+            raise Exception(
+                "[ERROR] stream=True only supports result_format='records'!"
+            )
         if primary_keys is not None and ids is not None:
             try:
+                import sentry_sdk
+
                 sentry_sdk.sdk("Duplicate Keys with both primary_keys and ids", "info")
             except Exception as e:
                 pass
@@ -395,14 +544,29 @@ class Vectordb(object):
                 req_data["facets"] = facets
 
         req_url = "{}/data/get".format(self._baseurl)
-        resp = requests.post(
-            url=req_url, data=json.dumps(req_data), headers=self._header, verify=False
+        resp = self._request(
+            "get", "post", req_url, data=self._serializer.dumps(req_data), stream=stream
         )
+        if stream:
+            return resp.status_code, StreamingResponse(resp)
         status_code = resp.status_code
         body = resp.json()
         resp.close()
         del resp
-        return status_code, body
+        return status_code, format_result(body, result_format, primary_key_field)
+
+    def iter_records(
+        self,
+        table_name: str,
+        page_size: int = 1000,
+        response_fields: Optional[list] = None,
+        filter: Optional[str] = None,
+        prefetch: bool = True,
+    ):
+        """Iterate over all records of a table, fetched page by page."""
+        return iter_records(
+            self, table_name, page_size, response_fields, filter, prefetch
+        )
 
-    def as_search_engine(self):
-        return SearchEngine(self)
+    def as_search_engine(self, **kwargs):
+        return SearchEngine(self, **kwargs)
@@ -1,4 +1,10 @@
 #!/usr/bin/env python
 # -*- coding:utf-8 -*-
 
+from .bulk import BulkWriter
+from .cache import QueryCache
+from .endpoint_cache import EndpointCache
+from .hedge import HedgePolicy
+from .result_set import ResultSet
+from .retry import RetryBudget, RetryPolicy
 from .search_engine import VectorRetriever, Reranker, RRFReRanker, RelativeScoreFusionReranker, DistributionBasedScoreFusionReranker, SearchEngine
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+from __future__ import annotations
+
+import asyncio
+import importlib
+from typing import Optional, Union
+
+from .serializer import Serializer, get_serializer
+
+
+class AsyncHTTPClient(object):
+    """Shared aiohttp plumbing for the asyncio clients.
+
+    One ClientSession (and its connection pool) is created lazily on first use,
+    and a semaphore bounds the number of in-flight requests per client.
+    """
+
+    def __init__(
+        self,
+        headers: dict,
+        proxies: dict = None,
+        connection_limit: int = 100,
+        connection_limit_per_host: int = 0,
+        max_concurrency: int = 100,
+        timeout: Optional[float] = None,
+        serializer: Union[str, Serializer] = None,
+    ):
+        try:
+            self._aiohttp = importlib.import_module("aiohttp")
+        except ImportError:
+            raise ValueError(
+                "The aiohttp python package is not installed. Please install it with `pip install aiohttp`"
+            )
+        self._header = headers
+        self._proxy = proxies
+        self._connection_limit = connection_limit
+        self._connection_limit_per_host = connection_limit_per_host
+        self._max_concurrency = max_concurrency
+        self._timeout = timeout
+        self._serializer = get_serializer(serializer)
+        self._session = None
+        self._semaphore = None
+
+    def _get_session(self):
+        # aiohttp sessions and semaphores must be created inside a running event loop
+        if self._session is None or self._session.closed:
+            connector = self._aiohttp.TCPConnector(
+                limit=self._connection_limit,
+                limit_per_host=self._connection_limit_per_host,
+                ssl=False,
+            )
+            self._session = self._aiohttp.ClientSession(
+                connector=connector,
+                timeout=self._aiohttp.ClientTimeout(total=self._timeout),
+            )
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        return self._session
+
+    def _proxy_for(self, url: str) -> Optional[str]:
+        if not self._proxy:
+            return None
+        scheme = url.split("://", 1)[0]
+        return self._proxy.get(scheme)
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        req_data=None,
+        timeout: Optional[float] = None,
+        text: bool = False,
+    ):
+        session = self._get_session()
+        kwargs = {"headers": self._header, "proxy": self._proxy_for(url)}
+        if req_data is not None:
+            kwargs["data"] = self._serializer.dumps(req_data)
+        if timeout is not None:
+            kwargs["timeout"] = self._aiohttp.ClientTimeout(total=timeout)
+        async with self._semaphore:
+            async with session.request(method, url, **kwargs) as resp:
+                status_code = resp.status
+                if text:
+                    body = await resp.text()
+                else:
+                    body = await resp.json(content_type=None)
+        return status_code, body
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Sequence
+
+
+def _batch_queries(
+    query_vectors: Optional[Sequence] = None,
+    query_texts: Optional[Sequence[str]] = None,
+) -> list[dict]:
+    # query_vectors may be a list of vectors/sparse dicts or a 2D numpy array
+    if query_vectors is None and query_texts is None:
+        raise Exception("[ERROR] Please provide query_vectors or query_texts!")
+    if query_vectors is not None and query_texts is not None:
+        if len(query_vectors) != len(query_texts):
+            raise Exception(
+                "[ERROR] query_vectors and query_texts should have the same length!"
+            )
+    size = len(query_vectors) if query_vectors is not None else len(query_texts)
+    queries = []
+    for i in range(size):
+        query = {}
+        if query_vectors is not None:
+            query["query_vector"] = query_vectors[i]
+        if query_texts is not None:
+            query["query_text"] = query_texts[i]
+        queries.append(query)
+    return queries
+
+
+def _error_result(e: Exception):
+    return None, {"statusCode": None, "message": str(e), "result": None}
+
+
+def query_batch(
+    db_client,
+    table_name: str,
+    query_vectors: Optional[Sequence] = None,
+    query_texts: Optional[Sequence[str]] = None,
+    max_in_flight: int = 8,
+    **kwargs,
+) -> list[tuple]:
+    """Run one query per vector/text concurrently with a thread pool.
+
+    Returns a (status_code, body) tuple per query in input order; a query that
+    raised gets status_code None and the error as body["message"].
+    """
+    queries = _batch_queries(query_vectors, query_texts)
+
+    def run(query):
+        try:
+            return db_client.query(table_name=table_name, **query, **kwargs)
+        except Exception as e:
+            return _error_result(e)
+
+    if not queries:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_in_flight, len(queries))) as executor:
+        return list(executor.map(run, queries))
+
+
+async def async_query_batch(
+    db_client,
+    table_name: str,
+    query_vectors: Optional[Sequence] = None,
+    query_texts: Optional[Sequence[str]] = None,
+    max_in_flight: int = 64,
+    **kwargs,
+) -> list[tuple]:
+    """asyncio counterpart of query_batch for the AsyncClient family."""
+    import asyncio
+
+    queries = _batch_queries(query_vectors, query_texts)
+    semaphore = asyncio.Semaphore(max_in_flight)
+
+    async def run(query):
+        async with semaphore:
+            try:
+                return await db_client.query(table_name=table_name, **query, **kwargs)
+            except Exception as e:
+                return _error_result(e)
+
+    return list(await asyncio.gather(*[run(query) for query in queries]))
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+from __future__ import annotations
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterable, Iterator, Optional
+
+from requests.exceptions import RequestException
+
+from .retry import RETRY_STATUS_CODES, connection_not_established
+from .serializer import JSONSerializer
+
+# records serialized to estimate the average record size, then every Nth record
+SIZE_SAMPLE = 32
+
+
+class BulkWriter:
+    """Chunk an iterable of records and insert/upsert the chunks concurrently.
+
+    Works with any client exposing insert(table_name, records) and
+    upsert(table_name, records) that return (status_code, body).
+
+    Chunks are retried on 429/502/503/504 and on connection errors. An insert
+    that may have reached the server (read timeout, reset connection) is not
+    retried, since resending it could write the records twice. When the client
+    has a RetryPolicy, its insert/upsert calls are already retried within that
+    policy's budget and BulkWriter does not retry on top of it.
+    max_chunk_bytes is approximate: record sizes are estimated from a sample of
+    serialized records instead of serializing every record twice.
+    """
+
+    def __init__(
+        self,
+        db_client,
+        chunk_size: int = 1000,
+        max_chunk_bytes: Optional[int] = 8 * 1024 * 1024,
+        max_workers: int = 4,
+        max_pending: Optional[int] = None,
+        max_retries: int = 3,
+        retry_interval: float = 1.0,
+    ):
+        self._db_client = db_client
+        self._chunk_size = chunk_size
+        self._max_chunk_bytes = max_chunk_bytes
+        self._max_workers = max_workers
+        # At most max_pending chunks are materialized at a time, which keeps
+        # memory bounded when records come from a generator.
+        self._max_pending = max_pending or max_workers * 2
+        # retrying the client's own retries would multiply requests per chunk
+        # and bypass the policy's retry budget
+        if getattr(db_client, "retry_policy", None) is not None:
+            max_retries = 0
+        self._max_retries = max_retries
+        self._retry_interval = retry_interval
+        # measure chunk sizes with the same serializer the client sends with
+        self._serializer = getattr(db_client, "_serializer", None) or JSONSerializer()
+
+    def chunks(self, records: Iterable[dict]) -> Iterator[list[dict]]:
+        chunk, chunk_bytes = [], 0
+        sampled, sampled_bytes = 0, 0
+        for index, record in enumerate(records):
+            record_bytes = 0
+            if self._max_chunk_bytes is not None:
+                if index < SIZE_SAMPLE or index % SIZE_SAMPLE == 0:
+                    sampled += 1
+                    sampled_bytes += len(self._serializer.dumps(record)) + 1
+                record_bytes = sampled_bytes / sampled
+                if chunk and chunk_bytes + record_bytes > self._max_chunk_bytes:
+                    yield chunk
+                    chunk, chunk_bytes = [], 0
+            chunk.append(record)
+            chunk_bytes += record_bytes
+            if len(chunk) >= self._chunk_size:
+                yield chunk
+                chunk, chunk_bytes = [], 0
+        if chunk:
+            yield chunk
+
+    def _send(self, table_name: str, chunk: list[dict], upsert: bool):
+        method = self._db_client.upsert if upsert else self._db_client.insert
+        retries = 0
+        while True:
+            try:
+                status_code, body = method(table_name, chunk)
+                body_status = body.get("statusCode", status_code)
+                if status_code == 200 and body_status == 200:
+                    return len(chunk), retries, None
+                error = "status code {}: {}".format(status_code, body.get("message"))
+                retryable = (
+                    status_code in RETRY_STATUS_CODES
+                    or body_status in RETRY_STATUS_CODES
+                )
+            except Exception as e:
+                error = str(e)
+                # upserts are idempotent, inserts only when the server never saw them
+                retryable = connection_not_established(e) or (
+                    upsert and isinstance(e, RequestException)
+                )
+            if not retryable or retries >= self._max_retries:
+                return 0, retries, error
+            time.sleep(self._retry_interval * (2**retries))
+            retries += 1
+
+    def write(self, table_name: str, records: Iterable[dict], upsert: bool = False):
+        result = {
+            "records": 0,
+            "chunks": 0,
+            "failed_records": 0,
+            "failed_chunks": 0,
+            "retries": 0,
+            "errors": [],
+        }
+
+        def collect(future):
+            index, size = pending.pop(future)
+            written, retries, error = future.result()
+            result["records"] += written
+            result["retries"] += retries
+            if error is not None:
+                result["failed_records"] += size
+                result["failed_chunks"] += 1
+                result["errors"].append({"chunk": index, "error": error})
+
+        start = time.perf_counter()
+        pending = {}
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            for index, chunk in enumerate(self.chunks(records)):
+                if len(pending) >= self._max_pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        collect(future)
+                future = executor.submit(self._send, table_name, chunk, upsert)
+                pending[future] = (index, len(chunk))
+                result["chunks"] += 1
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future)
+
+        elapsed = time.perf_counter() - start
+        result["elapsed"] = elapsed
+        result["records_per_second"] = result["records"] / elapsed if elapsed else 0.0
+        return result
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+class QueryCache:
+    """Thread-safe TTL + LRU cache for query responses.
+
+    Entries are indexed by table so writes through the same client can
+    invalidate them. A per-table generation counter keeps a query that was
+    in flight during a write from caching its (possibly stale) response.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = 60):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._entries = OrderedDict()
+        self._tables = {}
+        self._generations = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _remove(self, key: Hashable):
+        table, _, _ = self._entries.pop(key)
+        keys = self._tables.get(table)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._tables[table]
+
+    def get(self, key: Hashable):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._ttl is not None:
+                if time.monotonic() - entry[1] > self._ttl:
+                    self._remove(key)
+                    entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def _generation(self, table: str) -> tuple:
+        return self._epoch, self._generations.get(table, 0)
+
+    def generation(self, table: str) -> tuple:
+        with self._lock:
+            return self._generation(table)
+
+    def put(self, key: Hashable, table: str, value, generation: tuple = None):
+        with self._lock:
+            if generation is not None and generation != self._generation(table):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (table, time.monotonic(), value)
+            self._tables.setdefault(table, set()).add(key)
+            while len(self._entries) > self._maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, table: str):
+        with self._lock:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            for key in list(self._tables.get(table, ())):
+                self._remove(key)
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._tables.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Optional
+
+CACHE_FILENAME = "endpoints.json"
+
+
+def cache_key(project_id: str, api_key: str, *parts: str) -> str:
+    """Key scoped to a project and api key, the api key itself is never stored."""
+    digest = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+    return "/".join((project_id, digest) + parts)
+
+
+class EndpointCache:
+    """TTL cache for control plane lookups (db list, db public endpoints).
+
+    Entries live in memory and, when cache_dir is given, in a small JSON file
+    shared by all processes on the host. The file is rewritten atomically and
+    re-read whenever another process changed it, concurrent writers may drop
+    each other's updates which only costs a lookup.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, ttl: Optional[float] = 300, cache_dir: Optional[str] = None):
+        self._ttl = ttl
+        self._path = None
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._path = os.path.join(cache_dir, CACHE_FILENAME)
+        self._entries = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def shared(cls) -> EndpointCache:
+        """Process-wide in-memory cache used by clients unless they are given their own."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def _load(self):
+        try:
+            mtime = os.stat(self._path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self._path, "r") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        self._mtime = mtime
+        for key, (expires, value) in entries.items():
+            if key not in self._entries or self._entries[key][0] < expires:
+                self._entries[key] = (expires, value)
+
+    def _save(self):
+        now = time.time()
+        entries = {
+            key: entry
+            for key, entry in self._entries.items()
+            if entry[0] is None or entry[0] > now
+        }
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(self._path), prefix=CACHE_FILENAME, suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self._path)
+            self._mtime = os.stat(self._path).st_mtime_ns
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def get(self, key: str):
+        with self._lock:
+            if self._path is not None and key not in self._entries:
+                self._load()
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is not None and entry[0] <= time.time():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, value):
+        expires = time.time() + self._ttl if self._ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires, value)
+            if self._path is not None:
+                self._load()
+                self._entries[key] = (expires, value)
+                self._save()
+
+    def invalidate(self, key: str):
+        with self._lock:
+            if self._path is not None:
+                self._load()
+            if self._entries.pop(key, None) is not None and self._path is not None:
+                self._save()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._path is not None and os.path.exists(self._path):
+                os.remove(self._path)
+                self._mtime = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+from __future__ import annotations
+
+import socket
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError
+
+from .retry import connection_not_established
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+class EndpointUnavailable(ConnectionError):
+    """Raised instead of sending a request to an endpoint reported down."""
+
+
+class EndpointHealth:
+    """Health state of one host:port as seen by a HealthMonitor."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        # None until the first probe or request finished
+        self.up: Optional[bool] = None
+        self.latency_ewma: Optional[float] = None
+        self.consecutive_failures = 0
+        self.last_checked: Optional[float] = None
+        self.last_error: Optional[str] = None
+        # monotonic time the last request was let through while down
+        self.last_trial: Optional[float] = None
+        # number of watch() calls not matched by unwatch() yet
+        self.watchers = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "host": self.host,
+            "port": self.port,
+            "up": self.up,
+            "latency_ewma": self.latency_ewma,
+            "consecutive_failures": self.consecutive_failures,
+            "last_checked": self.last_checked,
+            "last_error": self.last_error,
+        }
+
+
+class HealthMonitor:
+    """Tracks reachability of endpoints from a background daemon thread.
+
+    Every interval seconds each watched endpoint gets a TCP connect probe with
+    its own timeout (the process-wide socket default is left alone). Probe
+    latency is smoothed into an EWMA. Requests sent through a HealthCheckedAdapter
+    also report connection failures and successes, so an endpoint is marked
+    down after failure_threshold refused connects without waiting for the next
+    probe. Requests to a down endpoint fail fast with EndpointUnavailable,
+    except for one request per down_interval that is let through as a trial,
+    and the endpoint is re-probed every down_interval, so it is marked up again
+    as soon as either succeeds.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        interval: float = 5.0,
+        timeout: float = 2.0,
+        alpha: float = 0.2,
+        failure_threshold: int = 3,
+        down_interval: float = 0.5,
+    ):
+        """
+        interval: seconds between probes of an endpoint.
+        timeout: connect timeout of a probe in seconds.
+        alpha: weight of the newest sample in the latency EWMA.
+        failure_threshold: consecutive failures before an endpoint is marked down.
+        down_interval: seconds between probes of, and trial requests to, an
+            endpoint that is marked down.
+        """
+        self._interval = interval
+        self._down_interval = down_interval
+        self._timeout = timeout
+        self._alpha = alpha
+        self._failure_threshold = failure_threshold
+        self._endpoints = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def shared(cls) -> HealthMonitor:
+        """Process-wide monitor used by clients unless they are given their own."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def watch(self, host: str, port: int) -> EndpointHealth:
+        """Start probing host:port in the background, returns without blocking.
+
+        Every watch() must be paired with an unwatch() once the caller is done."""
+        key = (host, int(port))
+        with self._lock:
+            endpoint = self._endpoints.get(key)
+            if endpoint is None:
+                endpoint = self._endpoints[key] = EndpointHealth(host, int(port))
+                self._wakeup.set()
+            endpoint.watchers += 1
+            if self._thread is None and not self._stopped.is_set():
+                self._thread = threading.Thread(
+                    target=self._run, name="pyepsilla-health-monitor", daemon=True
+                )
+                self._thread.start()
+        return endpoint
+
+    def unwatch(self, host: str, port: int):
+        """Stop probing host:port once every watch() of it has been undone."""
+        key = (host, int(port))
+        with self._lock:
+            endpoint = self._endpoints.get(key)
+            if endpoint is None:
+                return
+            endpoint.watchers -= 1
+            if endpoint.watchers <= 0:
+                del self._endpoints[key]
+                self._wakeup.set()
+
+    def get(self, host: str, port: int) -> Optional[EndpointHealth]:
+        return self._endpoints.get((host, int(port)))
+
+    def is_up(self, host: str, port: int) -> Optional[bool]:
+        endpoint = self.get(host, port)
+        return endpoint.up if endpoint is not None else None
+
+    def status(self) -> list[dict]:
+        with self._lock:
+            return [endpoint.to_dict() for endpoint in self._endpoints.values()]
+
+    def raise_if_down(self, host: str, port: int):
+        endpoint = self.get(host, port)
+        if endpoint is None or endpoint.up is not False:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if (
+                endpoint.last_trial is None
+                or now - endpoint.last_trial >= self._down_interval
+            ):
+                # half-open: let this request through to find out whether the
+                # endpoint is back, its outcome is recorded like any other
+                endpoint.last_trial = now
+                return
+        raise EndpointUnavailable(
+            "[ERROR] {}:{} is unreachable ({} failed checks, last error: {})".format(
+                host, port, endpoint.consecutive_failures, endpoint.last_error
+            )
+        )
+
+    def check(self, host: str, port: int) -> EndpointHealth:
+        """Probe host:port once in the calling thread and update its state."""
+        # an endpoint nobody watches is only tracked for the duration of the probe
+        watched = self.get(host, port) is not None
+        endpoint = self.get(host, port) if watched else self.watch(host, port)
+        start = time.monotonic()
+        try:
+            with socket.create_connection((host, int(port)), timeout=self._timeout):
+                pass
+        except OSError as e:
+            self.record_failure(host, port, e)
+        else:
+            self.record_success(host, port, time.monotonic() - start)
+        finally:
+            if not watched:
+                self.unwatch(host, port)
+        return endpoint
+
+    def record_success(self, host: str, port: int, latency: Optional[float] = None):
+        endpoint = self.get(host, port)
+        if endpoint is None:
+            return
+        with self._lock:
+            endpoint.up = True
+            endpoint.consecutive_failures = 0
+            endpoint.last_trial = None
+            endpoint.last_checked = time.time()
+            if latency is not None:
+                if endpoint.latency_ewma is None:
+                    endpoint.latency_ewma = latency
+                else:
+                    endpoint.latency_ewma += self._alpha * (
+                        latency - endpoint.latency_ewma
+                    )
+
+    def record_failure(self, host: str, port: int, error: Exception):
+        endpoint = self.get(host, port)
+        if endpoint is None:
+            return
+        with self._lock:
+            endpoint.consecutive_failures += 1
+            endpoint.last_checked = time.time()
+            endpoint.last_error = str(error) or type(error).__name__
+            if endpoint.consecutive_failures >= self._failure_threshold:
+                if endpoint.up is not False:
+                    # switch the probe thread to down_interval right away
+                    self._wakeup.set()
+                endpoint.up = False
+
+    def _run(self):
+        while not self._stopped.is_set():
+            with self._lock:
+                if not self._endpoints:
+                    # nothing left to probe, the next watch() starts a new thread
+                    self._thread = None
+                    return
+            self._wakeup.clear()
+            now = time.time()
+            wait = self._interval
+            for endpoint in list(self._endpoints.values()):
+                interval = (
+                    self._down_interval if endpoint.up is False else self._interval
+                )
+                if (
+                    endpoint.last_checked is None
+                    or now - endpoint.last_checked >= interval
+                ):
+                    self.check(endpoint.host, endpoint.port)
+                    # a probe that marked the endpoint down is due again soon
+                    if endpoint.up is False:
+                        interval = self._down_interval
+                    wait = min(wait, interval)
+                else:
+                    # sleep until the probe is due instead of a whole interval
+                    wait = min(wait, interval - (now - endpoint.last_checked))
+            self._wakeup.wait(max(wait, 0.01))
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+
+
+class HealthCheckedAdapter(HTTPAdapter):
+    """HTTPAdapter that fails fast on endpoints a HealthMonitor reports down and
+    reports connection errors and successes back to it."""
+
+    def __init__(self, monitor: HealthMonitor, **kwargs):
+        self._monitor = monitor
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        url = urlsplit(request.url)
+        host, port = url.hostname, url.port or DEFAULT_PORTS.get(url.scheme, 80)
+        self._monitor.raise_if_down(host, port)
+        try:
+            response = super().send(request, **kwargs)
+        except ConnectionError as e:
+            # a reset or read error on an established connection says nothing
+            # about whether the server accepts new ones
+            if connection_not_established(e):
+                self._monitor.record_failure(host, port, e)
+            raise
+        self._monitor.record_success(host, port)
+        return response
@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional
+
+from .retry import RetryBudget
+
+HEDGED_OPERATIONS = frozenset({"query", "get"})
+
+
+def _close_response(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+class HedgePolicy:
+    """Sends a second copy of a slow request and returns whichever answers first.
+
+    The hedge is sent once the first request has been outstanding longer than
+    the given percentile of recently observed latencies, so roughly
+    (100 - percentile)% of calls are hedged. A token bucket caps hedges at
+    max_hedge_rate of calls over time, allowing a burst of at most 10, so a
+    slow server does not get twice the load. The losing request is cancelled
+    if it has not been sent yet, otherwise its response is closed as soon as
+    it arrives. With a client that keeps a session (vectordb.Client) that
+    returns the connection to its pool, the cloud and enterprise clients open
+    a new connection per request and closing only releases it.
+
+    A blocking request cannot be abandoned by the calling thread, so the
+    first request runs on a worker thread only while a hedge could still
+    follow it. When the budget has no token left or all max_workers threads
+    are busy, the call runs inline in the calling thread and is not hedged.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95,
+        min_delay: float = 0.005,
+        max_delay: float = 1.0,
+        max_hedge_rate: float = 0.1,
+        window: int = 1000,
+        min_samples: int = 20,
+        max_workers: int = 32,
+    ):
+        """
+        percentile: latency percentile of recent requests after which to hedge.
+        min_delay, max_delay: bounds of the hedge delay in seconds, max_delay is
+            also used until min_samples latencies have been observed.
+        max_hedge_rate: maximum share of calls that may be hedged.
+        window: number of recent latencies the percentile is computed over.
+        max_workers: threads sending requests, calls run inline while all are busy.
+        """
+        self._percentile = percentile
+        self._min_delay = min_delay
+        self._max_delay = max_delay
+        self._min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        self._delay = max_delay
+        self._samples_since_update = 0
+        self._budget = RetryBudget(ratio=max_hedge_rate, max_tokens=10)
+        self._max_workers = max_workers
+        self._executor = None
+        self._inflight = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "calls": 0,
+            "inline": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+            "rate_limited": 0,
+            "cancelled": 0,
+        }
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_workers, thread_name_prefix="pyepsilla-hedge"
+                )
+            return self._executor
+
+    def _record(self, latency: float):
+        with self._lock:
+            self._latencies.append(latency)
+            self._samples_since_update += 1
+            # re-sorting the window on every sample is wasteful, the delay
+            # only has to follow the latency distribution loosely
+            if (
+                len(self._latencies) >= self._min_samples
+                and self._samples_since_update >= 16
+            ):
+                self._samples_since_update = 0
+                latencies = sorted(self._latencies)
+                index = int(len(latencies) * self._percentile / 100)
+                delay = latencies[min(index, len(latencies) - 1)]
+                self._delay = min(self._max_delay, max(self._min_delay, delay))
+
+    @property
+    def delay(self) -> float:
+        return self._delay
+
+    def _timed(self, send: Callable):
+        start = time.monotonic()
+        resp = send()
+        self._record(time.monotonic() - start)
+        return resp
+
+    def _reserve(self) -> bool:
+        # claim a worker thread, never queue behind busy ones
+        with self._lock:
+            if self._inflight >= self._max_workers:
+                return False
+            self._inflight += 1
+            return True
+
+    def _release(self, future):
+        with self._lock:
+            self._inflight -= 1
+
+    def _submit(self, executor: ThreadPoolExecutor, send: Callable):
+        future = executor.submit(self._timed, send)
+        future.add_done_callback(self._release)
+        return future
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def call(self, send: Callable, hedge_send: Optional[Callable] = None):
+        """Run send() and, if it is slow, hedge_send() (send() again by default),
+        returns the first response or raises if both attempts fail."""
+        self._count("calls")
+        self._budget.deposit()
+        if self._budget.tokens < 1 or not self._reserve():
+            self._count("inline")
+            return self._timed(send)
+        executor = self._get_executor()
+        primary = self._submit(executor, send)
+        done, _ = wait([primary], timeout=self._delay)
+        if done:
+            return primary.result()
+        if not self._budget.withdraw():
+            self._count("rate_limited")
+            return primary.result()
+        if not self._reserve():
+            self._count("rate_limited")
+            return primary.result()
+        self._count("hedged")
+        hedge = self._submit(executor, hedge_send or send)
+        pending = {primary, hedge}
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = next((f for f in done if f.exception() is None), None)
+            if winner is not None or not pending:
+                break
+        if winner is None:
+            # both failed, surface the error of the original request
+            return primary.result()
+        if winner is hedge:
+            self._count("hedge_wins")
+        for loser in {primary, hedge} - {winner}:
+            if loser.cancel():
+                self._count("cancelled")
+            else:
+                loser.add_done_callback(_close_response)
+        return winner.result()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["delay"] = self._delay
+        stats["hedge_rate"] = (
+            stats["hedged"] / stats["calls"] if stats["calls"] else 0.0
+        )
+        return stats
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterator, Optional
+
+
+def _page_result(table_name: str, status_code: int, body: dict) -> list[dict]:
+    if status_code != 200 or body.get("statusCode", 200) != 200:
+        error_msg = body["message"] if "message" in body else "Unknown error"
+        raise Exception(
+            f"[ERROR] Failed to get records from table {table_name}: {error_msg}"
+        )
+    return body["result"]
+
+
+def iter_records(
+    db_client,
+    table_name: str,
+    page_size: int = 1000,
+    response_fields: Optional[list] = None,
+    filter: Optional[str] = None,
+    prefetch: bool = True,
+) -> Iterator[dict]:
+    """Yield every record of a table, fetching it page by page with get(skip, limit).
+
+    With prefetch the next page is requested in a background thread while the
+    current one is consumed, so at most two pages are held in memory.
+    """
+
+    def fetch(skip: int) -> list[dict]:
+        status_code, body = db_client.get(
+            table_name=table_name,
+            response_fields=response_fields,
+            filter=filter,
+            skip=skip,
+            limit=page_size,
+        )
+        return _page_result(table_name, status_code, body)
+
+    if not prefetch:
+        skip = 0
+        while True:
+            page = fetch(skip)
+            yield from page
+            if len(page) < page_size:
+                return
+            skip += page_size
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        skip = 0
+        future = executor.submit(fetch, skip)
+        while future is not None:
+            page = future.result()
+            skip += page_size
+            future = executor.submit(fetch, skip) if len(page) == page_size else None
+            yield from page
+            del page
+
+
+async def async_iter_records(
+    db_client,
+    table_name: str,
+    page_size: int = 1000,
+    response_fields: Optional[list] = None,
+    filter: Optional[str] = None,
+    prefetch: bool = True,
+) -> AsyncIterator[dict]:
+    """asyncio counterpart of iter_records for the AsyncClient family."""
+    import asyncio
+
+    async def fetch(skip: int) -> list[dict]:
+        status_code, body = await db_client.get(
+            table_name=table_name,
+            response_fields=response_fields,
+            filter=filter,
+            skip=skip,
+            limit=page_size,
+        )
+        return _page_result(table_name, status_code, body)
+
+    skip = 0
+    task = asyncio.ensure_future(fetch(skip))
+    try:
+        while task is not None:
+            page = await task
+            skip += page_size
+            task = None
+            if len(page) == page_size:
+                task = asyncio.ensure_future(fetch(skip)) if prefetch else fetch(skip)
+            for record in page:
+                yield record
+            del page
+    finally:
+        if isinstance(task, asyncio.Future):
+            task.cancel()
+        elif task is not None:
+            task.close()
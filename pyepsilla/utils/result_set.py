@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+from __future__ import annotations
+
+import importlib
+from collections.abc import Mapping
+from numbers import Number
+from typing import Iterator, Optional
+
+RESULT_FORMATS = ("records", "columnar")
+
+
+def _import_numpy():
+    try:
+        return importlib.import_module("numpy")
+    except ImportError:
+        raise ValueError(
+            "The numpy python package is not installed. Please install it with `pip install numpy`"
+        )
+
+
+class RowView(Mapping):
+    """Lazy read-only view of one row of a ResultSet."""
+
+    def __init__(self, result_set: ResultSet, index: int):
+        self._result_set = result_set
+        self._index = index
+
+    def __getitem__(self, field: str):
+        if field not in self._result_set._records[self._index]:
+            raise KeyError(field)
+        return self._result_set.column(field)[self._index]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._result_set._records[self._index])
+
+    def __len__(self) -> int:
+        return len(self._result_set._records[self._index])
+
+    def __repr__(self) -> str:
+        return "RowView({})".format(dict(self))
+
+
+class ResultSet:
+    """Columnar view over query/get records.
+
+    Columns are built lazily on first access: numeric fields become 1D numpy
+    arrays, equal-length numeric lists (dense vectors) become 2D float32
+    arrays and anything else an object array.
+    """
+
+    def __init__(self, records: list[dict], primary_key: Optional[str] = None):
+        self._np = _import_numpy()
+        self._records = records
+        self._primary_key = primary_key
+        self._columns = {}
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[RowView]:
+        return (RowView(self, i) for i in range(len(self._records)))
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.column(key)
+        if key < 0:
+            key += len(self._records)
+        if not 0 <= key < len(self._records):
+            raise IndexError("ResultSet index out of range")
+        return RowView(self, key)
+
+    def __repr__(self) -> str:
+        return "ResultSet(rows={}, fields={})".format(len(self), self.fields)
+
+    @property
+    def fields(self) -> list[str]:
+        fields = {}
+        for record in self._records:
+            for field in record:
+                fields[field] = None
+        return list(fields)
+
+    @property
+    def records(self) -> list[dict]:
+        return self._records
+
+    @property
+    def primary_keys(self):
+        if self._primary_key is None:
+            raise Exception("[ERROR] ResultSet was created without a primary_key!")
+        return self.column(self._primary_key)
+
+    @property
+    def distances(self):
+        return self.column("@distance")
+
+    def column(self, field: str):
+        if field not in self._columns:
+            self._columns[field] = self._build_column(field)
+        return self._columns[field]
+
+    def _build_column(self, field: str):
+        np = self._np
+        values = [record.get(field) for record in self._records]
+        present = [value for value in values if value is not None]
+        if present and len(present) == len(values):
+            if all(isinstance(value, bool) for value in present):
+                return np.array(values, dtype=bool)
+            if all(isinstance(value, int) for value in present):
+                return np.array(values, dtype=np.int64)
+            if all(isinstance(value, list) for value in present):
+                dimensions = len(present[0])
+                if all(
+                    len(value) == dimensions
+                    and all(isinstance(x, Number) for x in value)
+                    for value in present
+                ):
+                    return np.array(values, dtype=np.float32).reshape(
+                        len(values), dimensions
+                    )
+        if present and all(
+            isinstance(value, Number) and not isinstance(value, bool)
+            for value in present
+        ):
+            # missing numeric values become NaN
+            return np.array(
+                [np.nan if value is None else value for value in values],
+                dtype=np.float64,
+            )
+        column = np.empty(len(values), dtype=object)
+        column[:] = values
+        return column
+
+    def to_dict(self) -> dict:
+        return {field: self.column(field) for field in self.fields}
+
+    def to_pandas(self):
+        try:
+            pd = importlib.import_module("pandas")
+        except ImportError:
+            raise ValueError(
+                "The pandas python package is not installed. Please install it with `pip install pandas`"
+            )
+        data = {}
+        for field, column in self.to_dict().items():
+            # pandas columns are 1D, vectors become per-row views of the 2D array
+            data[field] = list(column) if column.ndim > 1 else column
+        return pd.DataFrame(data, copy=False)
+
+    def to_arrow(self):
+        try:
+            pa = importlib.import_module("pyarrow")
+        except ImportError:
+            raise ValueError(
+                "The pyarrow python package is not installed. Please install it with `pip install pyarrow`"
+            )
+        arrays, names = [], []
+        for field, column in self.to_dict().items():
+            if column.ndim > 1:
+                array = pa.FixedSizeListArray.from_arrays(
+                    pa.array(column.reshape(-1)), column.shape[1]
+                )
+            elif column.dtype == object:
+                array = pa.array(column.tolist())
+            else:
+                array = pa.array(column)
+            arrays.append(array)
+            names.append(field)
+        return pa.Table.from_arrays(arrays, names=names)
+
+
+def format_result(
+    body: dict, result_format: str = "records", primary_key: Optional[str] = None
+) -> dict:
+    """Convert body["result"] of a query/get response to the requested result_format."""
+    if result_format not in RESULT_FORMATS:
+        raise Exception("[ERROR] Invalid result_format: {}".format(result_format))
+    if result_format == "columnar" and isinstance(body.get("result"), list):
+        body["result"] = ResultSet(body["result"], primary_key=primary_key)
+    return body
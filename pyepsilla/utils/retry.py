@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+from __future__ import annotations
+
+import random
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+from requests.exceptions import (
+    ChunkedEncodingError,
+    ConnectionError,
+    ConnectTimeout,
+    ReadTimeout,
+)
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+
+# operations that can be sent again without changing the outcome
+IDEMPOTENT_OPERATIONS = frozenset(
+    {
+        "welcome",
+        "state",
+        "validate",
+        "get_db_list",
+        "get_db_info",
+        "get_db_statistics",
+        "statistics",
+        "list_tables",
+        "query",
+        "get",
+        "upsert",
+    }
+)
+
+
+def connection_not_established(error: Exception) -> bool:
+    """True if the request failed before reaching the server, so it is safe to resend."""
+    # imported here since health builds on this module
+    from .health import EndpointUnavailable
+
+    if isinstance(error, (ConnectTimeout, EndpointUnavailable)):
+        return True
+    if isinstance(error, ConnectionError) and error.args:
+        reason = error.args[0]
+        if isinstance(reason, MaxRetryError):
+            reason = reason.reason
+        return isinstance(reason, NewConnectionError)
+    return False
+
+
+class RetryBudget:
+    """Token bucket that caps retries at a fraction of requests.
+
+    Every request deposits ratio tokens and every retry withdraws one, so in
+    steady state retries add at most ratio extra load on the server, while
+    max_tokens allows a short burst of retries after a quiet period.
+    """
+
+    def __init__(self, ratio: float = 0.2, max_tokens: float = 10):
+        self._ratio = ratio
+        self._max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self._max_tokens, self._tokens + self._ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    @property
+    def tokens(self) -> float:
+        return self._tokens
+
+
+class RetryPolicy:
+    """Retries client calls on transient failures with jittered exponential backoff.
+
+    Idempotent operations are retried on connection errors, read timeouts and
+    RETRY_STATUS_CODES responses. Other operations (insert, create_table, ...)
+    are only resent when the connection was never established, unless they
+    are listed in retry_operations. The same policy may be shared by several
+    clients, which then share its budget and stats. Only the synchronous
+    clients accept a RetryPolicy, the asyncio clients do not retry.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        backoff_base: float = 0.1,
+        backoff_max: float = 5.0,
+        jitter: bool = True,
+        retry_status_codes: Iterable[int] = RETRY_STATUS_CODES,
+        retry_inserts: bool = False,
+        retry_operations: Optional[Iterable[str]] = None,
+        budget: Optional[RetryBudget] = None,
+    ):
+        """
+        max_attempts: total number of attempts per call, including the first one.
+        backoff_base: delay before the first retry in seconds, doubled on every retry.
+        backoff_max: upper bound of a single delay, also caps Retry-After.
+        jitter: sleep a uniformly random time up to the delay ("full jitter").
+        retry_status_codes: response status codes treated as transient.
+        retry_inserts: also retry insert, which may write records twice without a
+            primary key.
+        retry_operations: extra operation names to treat as idempotent.
+        budget: RetryBudget limiting retries across calls, defaults to RetryBudget().
+        """
+        self._max_attempts = max(1, max_attempts)
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._jitter = jitter
+        self._retry_status_codes = frozenset(retry_status_codes)
+        self._operations = set(IDEMPOTENT_OPERATIONS)
+        if retry_inserts:
+            self._operations.add("insert")
+        if retry_operations is not None:
+            self._operations.update(retry_operations)
+        self._budget = budget if budget is not None else RetryBudget()
+        self._lock = threading.Lock()
+        self._stats = {
+            "calls": 0,
+            "retries": 0,
+            "recovered": 0,
+            "exhausted": 0,
+            "budget_exhausted": 0,
+            "reasons": {},
+        }
+
+    def is_idempotent(self, operation: str) -> bool:
+        return operation in self._operations
+
+    def backoff(self, attempt: int) -> float:
+        delay = min(self._backoff_max, self._backoff_base * (2**attempt))
+        return random.uniform(0, delay) if self._jitter else delay
+
+    def _retry_after(self, resp) -> Optional[float]:
+        value = resp.headers.get("Retry-After")
+        if value is None:
+            return None
+        try:
+            return min(self._backoff_max, max(0.0, float(value)))
+        except ValueError:
+            return None
+
+    def _count(self, key: str, reason: str = None):
+        with self._lock:
+            self._stats[key] += 1
+            if reason is not None:
+                reasons = self._stats["reasons"]
+                reasons[reason] = reasons.get(reason, 0) + 1
+
+    def call(self, operation: str, send: Callable):
+        """Run send() and retry it per this policy, returns the last response or raises
+        the last connection error."""
+        idempotent = self.is_idempotent(operation)
+        self._count("calls")
+        self._budget.deposit()
+        attempt = 0
+        while True:
+            delay, error = None, None
+            try:
+                resp = send()
+            except (ConnectionError, ReadTimeout, ChunkedEncodingError) as e:
+                if not (idempotent or connection_not_established(e)):
+                    raise
+                error, reason = e, type(e).__name__
+            else:
+                if resp.status_code not in self._retry_status_codes or not idempotent:
+                    if attempt > 0 and resp.status_code < 400:
+                        self._count("recovered")
+                    return resp
+                reason = str(resp.status_code)
+                delay = self._retry_after(resp)
+            attempt += 1
+            if attempt >= self._max_attempts:
+                self._count("exhausted")
+            elif not self._budget.withdraw():
+                self._count("budget_exhausted")
+            else:
+                if error is None:
+                    resp.close()
+                self._count("retries", reason)
+                time.sleep(self.backoff(attempt - 1) if delay is None else delay)
+                continue
+            if error is not None:
+                raise error
+            return resp
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats, reasons=dict(self._stats["reasons"]))
+        stats["budget_tokens"] = self._budget.tokens
+        return stats
@@ -2,8 +2,17 @@
 # -*- coding:utf-8 -*-
 from __future__ import annotations
 
+import heapq
+import importlib
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from operator import itemgetter
 from typing import Optional, Union
 
+# bound on threads of timed out retrievers left running, per pool worker
+STUCK_WORKERS_FACTOR = 4
+
 
 class VectorRetriever:
     def __init__(
@@ -17,6 +26,7 @@ class VectorRetriever:
         response_fields: list = None,
         limit: int = 2,
         filter: str = "",
+        timeout: Optional[float] = None,
     ):
         self._db_client = db_client
         self._table_name = table_name
@@ -27,20 +37,32 @@ class VectorRetriever:
         self._response_fields = response_fields
         self._limit = limit
         self._filter = filter
+        self._timeout = timeout
+
+    def _query_params(self, query: str) -> dict:
+        return {
+            "table_name": self._table_name,
+            "query_text": query,
+            "query_index": self._query_index,
+            "query_field": self._query_field,
+            "query_vector": self._query_vector,
+            "response_fields": self._response_fields,
+            "limit": self._limit,
+            "filter": self._filter,
+            "with_distance": True,
+        }
 
     def retrieve(self, query: str) -> list[dict]:
         # Query vectors from the table
-        status_code, response = self._db_client.query(
-            table_name=self._table_name,
-            query_text=query,
-            query_index=self._query_index,
-            query_field=self._query_field,
-            query_vector=self._query_vector,
-            response_fields=self._response_fields,
-            limit=self._limit,
-            filter=self._filter,
-            with_distance=True,
-        )
+        status_code, response = self._db_client.query(**self._query_params(query))
+        return self._process_response(status_code, response)
+
+    async def aretrieve(self, query: str) -> list[dict]:
+        # Query vectors from the table with an AsyncClient
+        status_code, response = await self._db_client.query(**self._query_params(query))
+        return self._process_response(status_code, response)
+
+    def _process_response(self, status_code: int, response: dict) -> list[dict]:
         if status_code != 200:
             error_msg = (
                 response["message"] if "message" in response else "Unknown error"
@@ -59,6 +81,71 @@ class VectorRetriever:
         return response["result"]
 
 
+def _import_numpy():
+    try:
+        return importlib.import_module("numpy")
+    except ImportError:
+        return None
+
+
+def _top_k(np, scores, limit: Optional[int]):
+    """Indices of the limit highest scores, highest first, ties in index order.
+
+    Uses argpartition-style selection (np.partition) so only the selected
+    candidates get sorted.
+    """
+    n = len(scores)
+    if limit is None or limit >= n:
+        return np.argsort(-scores, kind="stable")
+    if limit <= 0:
+        return np.empty(0, dtype=np.int64)
+    threshold = np.partition(scores, n - limit)[n - limit]
+    above = np.flatnonzero(scores > threshold)
+    ties = np.flatnonzero(scores == threshold)[: limit - len(above)]
+    selected = np.sort(np.concatenate([above, ties]))
+    return selected[np.argsort(-scores[selected], kind="stable")]
+
+
+def _top_items(items: list[dict], limit: Optional[int]) -> list[dict]:
+    # heapq.nlargest is equivalent to sorted(...)[:limit], ties included
+    if limit is not None and limit < len(items):
+        return heapq.nlargest(limit, items, key=lambda x: x["score"])
+    return sorted(items, key=lambda x: x["score"], reverse=True)
+
+
+def _fuse(np, candidates: list[list[dict]], scores: list, limit: Optional[int]):
+    """Sum per-list scores by @id and return the top candidates.
+
+    Ids are factorized once into dense codes (first occurrence wins as the
+    returned record), then scores are accumulated with np.bincount.
+    """
+    codes, unique = {}, []
+    flat_codes = []
+    for candidate_list in candidates:
+        for candidate in candidate_list:
+            code = codes.get(candidate["@id"])
+            if code is None:
+                code = codes[candidate["@id"]] = len(unique)
+                unique.append(candidate)
+            flat_codes.append(code)
+    if not unique:
+        return []
+    totals = np.bincount(
+        np.array(flat_codes, dtype=np.int64),
+        weights=np.concatenate(scores),
+        minlength=len(unique),
+    )
+    return [unique[i] for i in _top_k(np, totals, limit)]
+
+
+def _distances(np, candidate_list: list[dict]):
+    return np.fromiter(
+        (candidate["@distance"] for candidate in candidate_list),
+        dtype=np.float64,
+        count=len(candidate_list),
+    )
+
+
 class Reranker:
     def rerank(self, candidates: list[list[any]], query: str = None) -> list[any]:
         pass
@@ -71,15 +158,124 @@ class RRFReRanker(Reranker):
         self._limit = limit
 
     def rerank(self, candidates: list[list[any]]) -> list[any]:
-        # Use candidate["@distance"] of each candidate to rerank
+        # Use the rank of each candidate in its list to rerank
         # Initialize weights if not provided
-        if not self._weights:
-            self._weights = [1] * len(candidates)
-
+        weights = self._weights or [1] * len(candidates)
+        top = self._rerank_early_exit(candidates, weights)
+        if top is not None:
+            return top
+        np = _import_numpy()
+        if np is None:
+            return self._rerank_python(candidates, weights)
+
+        # RRF score of rank r (1-based) in list i is weights[i] / (k + r)
+        scores = [
+            weights[i] / (self._k + np.arange(1, len(candidate_list) + 1))
+            for i, candidate_list in enumerate(candidates)
+        ]
+        return _fuse(np, candidates, scores, self._limit)
+
+    def _rerank_early_exit(
+        self, candidates: list[list[any]], weights: list
+    ) -> Optional[list[any]]:
+        """Top limit candidates read from the heads of the lists only, or None.
+
+        Lists are read in growing depth. Past depth d, rank r > d in list i adds
+        at most weights[i] / (k + d + 1), which bounds the final score of every
+        candidate from above, while its partial score bounds it from below.
+        Once the bounds put the best limit candidates in a strict order above
+        all others, deeper ranks cannot change the result. Needs each @id at
+        most once per list, as in query results.
+        """
+        limit = self._limit
+        lengths = [len(candidate_list) for candidate_list in candidates]
+        max_length = max(lengths, default=0)
+        if (
+            limit is None
+            or limit <= 0
+            or 16 * limit > max_length
+            or self._k < 0
+            or any(weight < 0 for weight in weights)
+        ):
+            return None
+        get_id = itemgetter("@id")
+
+        # @id -> [partial score, lists it was seen in, first (list, rank), record]
+        partial_scores = {}
+        depth, next_depth = 0, limit
+        # lists that only agree deep down are cheaper to fuse in full
+        while next_depth <= 8 * limit:
+            for i, candidate_list in enumerate(candidates):
+                for rank in range(depth, min(next_depth, lengths[i])):
+                    candidate = candidate_list[rank]
+                    score = weights[i] / (self._k + rank + 1)
+                    entry = partial_scores.get(candidate["@id"])
+                    if entry is None:
+                        partial_scores[candidate["@id"]] = [
+                            score,
+                            {i},
+                            (i, rank),
+                            candidate,
+                        ]
+                    else:
+                        entry[0] += score
+                        entry[1].add(i)
+                        if (i, rank) < entry[2]:
+                            entry[2], entry[3] = (i, rank), candidate
+            depth, next_depth = next_depth, 2 * next_depth
+
+            # most a deeper rank can still add in each list
+            tail = [
+                weight / (self._k + depth + 1) if length > depth else 0
+                for weight, length in zip(weights, lengths)
+            ]
+            # margin keeps float rounding of the sums from deciding ties
+            margin = 1 + 1e-9
+            if len(partial_scores) < limit:
+                continue
+            # cheap check first: unseen candidates must already be out of reach
+            kth_score = heapq.nlargest(
+                limit, [entry[0] for entry in partial_scores.values()]
+            )[-1]
+            if kth_score <= sum(tail) * margin:
+                continue
+            bounds = []
+            for candidate_id, entry in partial_scores.items():
+                upper = entry[0] + sum(
+                    t for i, t in enumerate(tail) if i not in entry[1]
+                )
+                bounds.append((entry[0], upper, candidate_id))
+            bounds.sort(key=itemgetter(0), reverse=True)
+            others = max([upper for _, upper, _ in bounds[limit:]], default=0)
+            if bounds[limit - 1][0] <= others * margin or any(
+                bounds[j][0] <= bounds[j + 1][1] * margin for j in range(limit - 1)
+            ):
+                continue
+
+            # the bounds hold only if no @id repeats within a list
+            for candidate_list in candidates:
+                if len(set(map(get_id, candidate_list))) != len(candidate_list):
+                    return None
+            top_ids = [candidate_id for _, _, candidate_id in bounds[:limit]]
+            # the returned record is the first occurrence in list order, which may
+            # sit past depth in an earlier list the candidate was not seen in
+            for candidate_id in top_ids:
+                entry = partial_scores[candidate_id]
+                for i in range(entry[2][0]):
+                    if i in entry[1] or lengths[i] <= depth:
+                        continue
+                    tail_ids = list(map(get_id, candidates[i][depth:]))
+                    if candidate_id in tail_ids:
+                        entry[3] = candidates[i][depth + tail_ids.index(candidate_id)]
+                        break
+            return [partial_scores[candidate_id][3] for candidate_id in top_ids]
+        return None
+
+    def _rerank_python(self, candidates: list[list[any]], weights: list) -> list[any]:
         # Calculate RRF scores for each candidate
         rrf_scores = {}
         for i, candidate_list in enumerate(candidates):
-            weight = self._weights[i]
+            weight = weights[i]
             for rank, candidate in enumerate(candidate_list, start=1):
                 # Calculate RRF score for this candidate in this list
                 rrf_score = weight / (self._k + rank)
@@ -92,14 +288,8 @@ class RRFReRanker(Reranker):
                         "score": rrf_score,
                     }
 
-        # Sort candidates based on aggregated RRF score
-        sorted_candidates = sorted(
-            rrf_scores.values(), key=lambda x: x["score"], reverse=True
-        )
-
-        # Apply the limit to the final list if specified
-        if self._limit is not None:
-            sorted_candidates = sorted_candidates[: self._limit]
+        # Select the top candidates based on aggregated RRF score
+        sorted_candidates = _top_items(list(rrf_scores.values()), self._limit)
 
         # Return only the candidate information, discarding the scores
         return [item["candidate"] for item in sorted_candidates]
@@ -131,6 +321,23 @@ class RelativeScoreFusionReranker(Reranker):
         return normalized_candidates
 
     def rerank(self, candidates: list[list[dict]]) -> list[dict]:
+        np = _import_numpy()
+        if np is None:
+            return self._rerank_python(candidates)
+
+        scores = []
+        for candidate_list in candidates:
+            distances = _distances(np, candidate_list)
+            if len(distances) < 2 or distances.max() == distances.min():
+                scores.append(np.ones(len(distances)))
+            else:
+                min_distance, max_distance = distances.min(), distances.max()
+                scores.append(
+                    1 - (distances - min_distance) / (max_distance - min_distance)
+                )
+        return _fuse(np, candidates, scores, self._limit)
+
+    def _rerank_python(self, candidates: list[list[dict]]) -> list[dict]:
         normalized_lists = [
             self.normalize_distances(candidate_list) for candidate_list in candidates
         ]
@@ -145,14 +352,8 @@ class RelativeScoreFusionReranker(Reranker):
                 else:
                     aggregated_scores[candidate_id] = item
 
-        # Sort candidates based on aggregated score
-        sorted_candidates = sorted(
-            aggregated_scores.values(), key=lambda x: x["score"], reverse=True
-        )
-
-        # Apply the limit to the final list if specified
-        if self._limit is not None:
-            sorted_candidates = sorted_candidates[: self._limit]
+        # Select the top candidates based on aggregated score
+        sorted_candidates = _top_items(list(aggregated_scores.values()), self._limit)
 
         # Return only the candidate information, discarding the scores
         return [item["candidate"] for item in sorted_candidates]
@@ -179,6 +380,20 @@ class DistributionBasedScoreFusionReranker(Reranker):
         return normalized_candidates
 
     def rerank(self, candidates: list[list[dict]]) -> list[dict]:
+        np = _import_numpy()
+        if np is None:
+            return self._rerank_python(candidates)
+
+        scores = []
+        for i, candidate_list in enumerate(candidates):
+            low, high = self._scale_ranges[i][0], self._scale_ranges[i][1]
+            normalized = np.maximum(_distances(np, candidate_list) - low, 0) / (
+                high - low
+            )
+            scores.append(1 - np.minimum(1, normalized))
+        return _fuse(np, candidates, scores, self._limit)
+
+    def _rerank_python(self, candidates: list[list[dict]]) -> list[dict]:
         normalized_lists = [
             self.normalize_distances(self._scale_ranges[i], candidate_list)
             for i, candidate_list in enumerate(candidates)
@@ -194,14 +409,8 @@ class DistributionBasedScoreFusionReranker(Reranker):
                 else:
                     aggregated_scores[candidate_id] = item
 
-        # Sort candidates based on aggregated score
-        sorted_candidates = sorted(
-            aggregated_scores.values(), key=lambda x: x["score"], reverse=True
-        )
-
-        # Apply the limit to the final list if specified
-        if self._limit is not None:
-            sorted_candidates = sorted_candidates[: self._limit]
+        # Select the top candidates based on aggregated score
+        sorted_candidates = _top_items(list(aggregated_scores.values()), self._limit)
 
         # Return only the candidate information, discarding the scores
         return [item["candidate"] for item in sorted_candidates]
@@ -211,10 +420,34 @@ class SearchEngine:
     def __init__(
         self,
         db_client,
+        executor: Optional[Executor] = None,
+        max_workers: Optional[int] = None,
+        timeout: Optional[float] = None,
+        partial_results: bool = False,
     ):
+        """
+        executor: executor to run retrievers on, an engine-owned thread pool is used if None.
+        max_workers: size of the engine-owned thread pool, defaults to the number of retrievers.
+        timeout: default per-retriever timeout in seconds, add_retriever() can override it.
+            A timed out retriever cannot be interrupted and keeps its thread until
+            its request returns, so give the db client a timeout as well. The
+            engine-owned pool is replaced after a timeout so later searches do not
+            queue behind it, with at most STUCK_WORKERS_FACTOR * max_workers such
+            threads left running; a given executor keeps them.
+        partial_results: when a retriever fails or times out, rerank the remaining
+            candidates instead of raising; the failures are kept in last_errors.
+        """
         self._db_client = db_client
         self._retrievers = []
         self._reranker: Reranker = None
+        self._executor = executor
+        self._own_executor = None
+        self._own_executor_size = 0
+        self._stuck = set()
+        self._max_workers = max_workers
+        self._timeout = timeout
+        self._partial_results = partial_results
+        self.last_errors = []
 
     def add_retriever(
         self,
@@ -226,6 +459,7 @@ class SearchEngine:
         response_fields: list = None,
         limit: int = 2,
         filter: str = "",
+        timeout: Optional[float] = None,
     ) -> SearchEngine:
         self._reranker = None
         self._retrievers.append(
@@ -239,6 +473,7 @@ class SearchEngine:
                 response_fields=response_fields,
                 limit=limit,
                 filter=filter,
+                timeout=timeout if timeout is not None else self._timeout,
             )
         )
         return self
@@ -271,7 +506,7 @@ class SearchEngine:
             raise Exception("Invalid reranker type: " + type)
         return self
 
-    def search(self, query: str) -> list[dict]:
+    def _check_retrievers(self):
         # If no retriever is added, return error
         if not self._retrievers:
             raise Exception("No retriever added to the search engine")
@@ -281,13 +516,117 @@ class SearchEngine:
                 "More than one retriever added to the search engine, but no reranker is set"
             )
 
-        # Use ThreadPoolExecutor to run retrievers concurrently
-        candidates = []
-        for retriever in self._retrievers:
-            candidates.append(retriever.retrieve(query))
+    def _get_executor(self) -> Executor:
+        if self._executor is not None:
+            return self._executor
+        max_workers = self._max_workers or len(self._retrievers)
+        if self._own_executor is None or self._own_executor_size < max_workers:
+            if self._own_executor is not None:
+                self._own_executor.shutdown(wait=False)
+            self._own_executor = ThreadPoolExecutor(max_workers=max_workers)
+            self._own_executor_size = max_workers
+        return self._own_executor
+
+    def _abandon(self, futures: list):
+        # running futures cannot be cancelled, retire the pool they occupy
+        stuck = {future for future in futures if not future.cancel()}
+        stuck = {future for future in stuck | self._stuck if not future.done()}
+        if not stuck or self._executor is not None or self._own_executor is None:
+            return
+        max_workers = self._max_workers or len(self._retrievers)
+        if len(stuck) <= STUCK_WORKERS_FACTOR * max_workers:
+            self._stuck = stuck
+            self._own_executor.shutdown(wait=False)
+            self._own_executor = None
+
+    def _collect(
+        self, results: list, timeout_errors: tuple = (FutureTimeoutError,)
+    ) -> list[list[dict]]:
+        # A failed retriever keeps its slot with no candidates, so weights and
+        # scale_ranges of the rerankers still line up with the retrievers.
+        candidates, errors = [], []
+        for retriever, result in zip(self._retrievers, results):
+            if isinstance(result, BaseException):
+                if isinstance(result, timeout_errors):
+                    result = Exception(
+                        f"Retriever on table {retriever._table_name} timed out after {retriever._timeout}s"
+                    )
+                if not self._partial_results:
+                    raise result
+                errors.append({"table_name": retriever._table_name, "error": result})
+                candidates.append([])
+            else:
+                candidates.append(result)
+        self.last_errors = errors
+        if errors and len(errors) == len(self._retrievers):
+            raise errors[0]["error"]
+        return candidates
 
+    def _rerank(self, candidates: list[list[dict]]) -> list[dict]:
         # Rerank candidates if reranker is set
         if self._reranker:
             candidates = self._reranker.rerank(candidates)
-
         return candidates
+
+    def search(self, query: str) -> list[dict]:
+        self._check_retrievers()
+
+        # Run retrievers concurrently, each one bounded by its own timeout
+        executor = self._get_executor()
+        start = time.monotonic()
+        futures = [
+            executor.submit(retriever.retrieve, query) for retriever in self._retrievers
+        ]
+        results, timed_out = [], []
+        for retriever, future in zip(self._retrievers, futures):
+            try:
+                timeout = None
+                if retriever._timeout is not None:
+                    timeout = max(0, retriever._timeout - (time.monotonic() - start))
+                results.append(future.result(timeout=timeout))
+            except FutureTimeoutError as e:
+                timed_out.append(future)
+                results.append(e)
+            except Exception as e:
+                results.append(e)
+        if timed_out:
+            self._abandon(timed_out)
+
+        return self._rerank(self._collect(results))
+
+    async def asearch(self, query: str) -> list[dict]:
+        """asyncio mode of search(), works with both AsyncClient and blocking clients."""
+        import asyncio
+
+        self._check_retrievers()
+
+        timed_out = []
+
+        async def run(retriever):
+            future = None
+            if asyncio.iscoroutinefunction(retriever._db_client.query):
+                coro = retriever.aretrieve(query)
+            else:
+                future = self._get_executor().submit(retriever.retrieve, query)
+                coro = asyncio.wrap_future(future)
+            try:
+                return await asyncio.wait_for(coro, timeout=retriever._timeout)
+            except asyncio.TimeoutError:
+                if future is not None:
+                    timed_out.append(future)
+                raise
+
+        results = await asyncio.gather(
+            *[run(retriever) for retriever in self._retrievers],
+            return_exceptions=True,
+        )
+        if timed_out:
+            self._abandon(timed_out)
+        return self._rerank(
+            self._collect(results, (FutureTimeoutError, asyncio.TimeoutError))
+        )
+
+    def close(self):
+        if self._own_executor is not None:
+            self._own_executor.shutdown(wait=False)
+            self._own_executor = None
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+from __future__ import annotations
+
+import importlib
+import json
+import re
+import sys
+import uuid
+from typing import Union
+
+
+def _numpy():
+    # numpy is optional and only looked up once loaded: without it imported
+    # there cannot be any arrays to serialize, and importing it here would
+    # slow down importing pyepsilla
+    return sys.modules.get("numpy")
+
+
+class Serializer:
+    """Turns a request body into JSON text/bytes for the HTTP layer."""
+
+    name = None
+
+    def dumps(self, obj) -> Union[str, bytes]:
+        raise NotImplementedError
+
+
+class JSONSerializer(Serializer):
+    """Standard library json, with a pre-formatted float buffer path for numpy arrays.
+
+    Arrays are formatted with one printf-style call per row over array.tolist()
+    instead of going through json's encoder float by float; float32 values are
+    written with 9 significant digits, which round-trips exactly, and always
+    keep a decimal point so they stay floats. NaN and infinity have no JSON
+    representation and are rejected, in arrays and plain Python values alike.
+    """
+
+    name = "json"
+
+    def __init__(self):
+        self._token = "__pyepsilla_ndarray_{}_".format(uuid.uuid4().hex)
+        self._placeholder = re.compile('"{}(\\d+)"'.format(self._token))
+        self._formats = {}
+
+    def _row_format(self, kind: str, size: int) -> str:
+        key = (kind, size)
+        if key not in self._formats:
+            self._formats[key] = ",".join([kind] * size)
+        return self._formats[key]
+
+    def format_array(self, array) -> str:
+        if array.ndim == 0:
+            return json.dumps(array.item())
+        if array.ndim > 1:
+            return "[" + ",".join(self.format_array(row) for row in array) + "]"
+        np = _numpy()
+        if array.dtype.kind == "f" and not np.isfinite(array).all():
+            raise ValueError("Out of range float values are not JSON compliant")
+        if array.dtype.kind == "f" and array.dtype.itemsize <= 4:
+            # "#" keeps the decimal point, 1.0 is written as 1.00000000 not 1
+            kind = "%#.9g"
+        elif array.dtype.kind == "f":
+            kind = "%r"
+        elif array.dtype.kind in "iu":
+            kind = "%d"
+        else:
+            return json.dumps(array.tolist())
+        if array.size == 0:
+            return "[]"
+        return "[" + self._row_format(kind, array.size) % tuple(array.tolist()) + "]"
+
+    def dumps(self, obj) -> str:
+        fragments = []
+
+        def default(o):
+            np = _numpy()
+            if np is not None:
+                if isinstance(o, np.ndarray):
+                    fragments.append(self.format_array(o))
+                    return "{}{}".format(self._token, len(fragments) - 1)
+                if isinstance(o, np.generic):
+                    return o.item()
+            raise TypeError(
+                "Object of type {} is not JSON serializable".format(type(o).__name__)
+            )
+
+        text = json.dumps(obj, default=default, allow_nan=False)
+        if fragments:
+            text = self._placeholder.sub(lambda m: fragments[int(m.group(1))], text)
+        return text
+
+
+class OrjsonSerializer(Serializer):
+    """orjson, which serializes numpy arrays natively without building lists."""
+
+    name = "orjson"
+
+    def __init__(self):
+        try:
+            self._orjson = importlib.import_module("orjson")
+        except ImportError:
+            raise ValueError(
+                "The orjson python package is not installed. Please install it with `pip install orjson`"
+            )
+        self._option = self._orjson.OPT_SERIALIZE_NUMPY
+
+    def _default(self, o):
+        np = _numpy()
+        if np is not None:
+            if isinstance(o, np.ndarray):
+                # non-contiguous arrays and dtypes orjson does not support natively
+                if o.dtype.kind == "f" and o.dtype.itemsize == 2:
+                    return o.astype(np.float32)
+                if not o.flags["C_CONTIGUOUS"]:
+                    return np.ascontiguousarray(o)
+                return o.tolist()
+            if isinstance(o, np.generic):
+                return o.item()
+        raise TypeError
+
+    def dumps(self, obj) -> bytes:
+        return self._orjson.dumps(obj, default=self._default, option=self._option)
+
+
+def get_serializer(serializer: Union[str, Serializer, None] = None) -> Serializer:
+    """Resolve a serializer instance or name ("json", "orjson", "auto" for orjson when
+    installed), None is the standard library json.
+
+    orjson is opt-in since it differs from json on edge cases: it rejects
+    non-str dict keys and writes NaN as null.
+    """
+    if isinstance(serializer, Serializer):
+        return serializer
+    if serializer == "auto":
+        try:
+            return OrjsonSerializer()
+        except ValueError:
+            return JSONSerializer()
+    if serializer is None or serializer == "json":
+        return JSONSerializer()
+    if serializer == "orjson":
+        return OrjsonSerializer()
+    raise Exception("[ERROR] Invalid serializer: {}".format(serializer))
@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+from __future__ import annotations
+
+import codecs
+import importlib
+import json
+from typing import Iterator, Optional
+
+WHITESPACE = " \t\n\r"
+
+
+class _JSONStreamReader:
+    """Incremental reader that decodes JSON values from a stream of byte chunks.
+
+    Values are decoded with json.JSONDecoder.raw_decode on a sliding text buffer,
+    only retried once the buffer has doubled, so decoding stays linear even
+    when a single value spans many chunks.
+    """
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        # decoded text not merged into _buf yet, joined only when needed
+        self._pending = []
+        self._pending_len = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        for chunk in self._chunks:
+            if chunk:
+                text = self._utf8.decode(chunk)
+                self._pending.append(text)
+                self._pending_len += len(text)
+                return True
+        text = self._utf8.decode(b"", final=True)
+        self._pending.append(text)
+        self._pending_len += len(text)
+        self._eof = True
+        return False
+
+    def _merge(self):
+        if self._pending:
+            self._buf = self._buf[self._pos :] + "".join(self._pending)
+            self._pos = 0
+            self._pending = []
+            self._pending_len = 0
+
+    def skip_whitespace(self):
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return
+            if not self._pending and not self._fill() and not self._pending_len:
+                return
+            self._merge()
+
+    def peek(self) -> str:
+        self.skip_whitespace()
+        return self._buf[self._pos] if self._pos < len(self._buf) else ""
+
+    def next_char(self) -> str:
+        char = self.peek()
+        if not char:
+            raise Exception("[ERROR] Unexpected end of JSON response")
+        self._pos += 1
+        return char
+
+    def expect(self, char: str):
+        if self.next_char() != char:
+            raise Exception(
+                "[ERROR] Malformed JSON response, expected '{}' at {}".format(
+                    char, self._pos - 1
+                )
+            )
+
+    def value(self):
+        self.skip_whitespace()
+        threshold = 0
+        while True:
+            available = len(self._buf) - self._pos + self._pending_len
+            if available >= threshold or self._eof:
+                self._merge()
+                try:
+                    obj, end = self._json.raw_decode(self._buf, self._pos)
+                    # a number ending exactly at the buffer end may be truncated
+                    if end < len(self._buf) or self._eof:
+                        self._pos = end
+                        return obj
+                    threshold = available + 1
+                except json.JSONDecodeError:
+                    if self._eof:
+                        raise
+                    threshold = available * 2
+            self._fill()
+
+
+class StreamingResponse:
+    """Lazily decoded query/get response.
+
+    Iterating yields the records of the top-level "result" array one at a
+    time straight from the HTTP stream. The other top-level fields
+    (statusCode, message, ...) are collected in body; fields that follow
+    "result" in the payload are only available once iteration finished.
+    """
+
+    def __init__(self, resp, chunk_size: int = 64 * 1024):
+        self._resp = resp
+        self.status_code = resp.status_code
+        self.body = {}
+        self._reader = _JSONStreamReader(resp.iter_content(chunk_size=chunk_size))
+        self._consumed = False
+        self._vector_blocks = {}
+        self._vector_counts = {}
+
+    def _parse(self) -> Iterator:
+        reader = self._reader
+        if reader.peek() != "{":
+            raise Exception(
+                "[ERROR] Response with status code {} is not a JSON object".format(
+                    self.status_code
+                )
+            )
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+        while True:
+            key = reader.value()
+            reader.expect(":")
+            if key == "result" and reader.peek() == "[":
+                reader.expect("[")
+                if reader.peek() == "]":
+                    reader.expect("]")
+                else:
+                    while True:
+                        yield reader.value()
+                        if reader.next_char() == "]":
+                            break
+            else:
+                self.body[key] = reader.value()
+            if reader.next_char() == "}":
+                return
+
+    def records(
+        self, vector_fields: Optional[dict] = None, block_size: int = 1024
+    ) -> Iterator[dict]:
+        """Yield records one at a time.
+
+        vector_fields maps vector field names to their dimensions; those fields
+        are copied into preallocated float32 blocks of block_size rows and each
+        record gets a row view instead of a Python list. Use vectors() to get
+        all decoded rows of a field as one array.
+        """
+        if self._consumed:
+            raise Exception("[ERROR] The streaming response was already consumed!")
+        self._consumed = True
+        np = None
+        if vector_fields:
+            try:
+                np = importlib.import_module("numpy")
+            except ImportError:
+                raise ValueError(
+                    "The numpy python package is not installed. Please install it with `pip install numpy`"
+                )
+        try:
+            for record in self._parse():
+                if vector_fields and isinstance(record, dict):
+                    for field, dimensions in vector_fields.items():
+                        if record.get(field) is None:
+                            continue
+                        blocks = self._vector_blocks.setdefault(field, [])
+                        row = self._vector_counts.get(field, 0) % block_size
+                        if row == 0:
+                            blocks.append(
+                                np.empty((block_size, dimensions), dtype=np.float32)
+                            )
+                        blocks[-1][row] = record[field]
+                        record[field] = blocks[-1][row]
+                        self._vector_counts[field] = (
+                            self._vector_counts.get(field, 0) + 1
+                        )
+                yield record
+        finally:
+            self.close()
+
+    def __iter__(self) -> Iterator[dict]:
+        return self.records()
+
+    def vectors(self, field: str):
+        """All rows decoded so far for a field passed in records(vector_fields=...)."""
+        np = importlib.import_module("numpy")
+        blocks = self._vector_blocks.get(field, [])
+        count = self._vector_counts.get(field, 0)
+        if not blocks:
+            return np.empty((0, 0), dtype=np.float32)
+        if len(blocks) == 1:
+            return blocks[0][:count]
+        return np.concatenate(blocks)[:count]
+
+    def close(self):
+        self._resp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
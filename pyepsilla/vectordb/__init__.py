@@ -1,6 +1,8 @@
 #!/usr/bin/env python
 # -*- coding:utf-8 -*-
 
+import importlib
+
 from .client import Client
 from .field import Field, FieldType
 # from .sentry import init_sentry
@@ -13,3 +15,12 @@ from .field import Field, FieldType
 #   telemetry_manager = TelemetryManager.get_singleton()
 # except Exception:
 #   pass
+
+
+# AsyncClient pulls in asyncio, import it on first use
+def __getattr__(name):
+    if name == "AsyncClient":
+        module = importlib.import_module(".async_client", __name__)
+        globals()[name] = module.AsyncClient
+        return module.AsyncClient
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
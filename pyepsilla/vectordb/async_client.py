@@ -0,0 +1,324 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+from __future__ import annotations
+
+import asyncio
+import datetime
+from typing import Optional, Sequence, Union
+
+
+from ..utils.async_http import AsyncHTTPClient
+from ..utils.batch import async_query_batch
+from ..utils.pagination import async_iter_records
+from ..utils.result_set import RESULT_FORMATS, format_result
+from ..utils.search_engine import SearchEngine
+from ..utils.serializer import Serializer
+
+
+class AsyncClient(AsyncHTTPClient):
+    """asyncio counterpart of vectordb.Client, backed by a pooled aiohttp session."""
+
+    def __init__(
+        self,
+        protocol: str = "http",
+        host: str = "localhost",
+        port: str = "8888",
+        headers: dict = None,
+        connection_limit: int = 100,
+        connection_limit_per_host: int = 0,
+        max_concurrency: int = 100,
+        serializer: Union[str, Serializer] = None,
+    ):
+        self._protocol = protocol
+        self._host = host
+        self._port = port
+        self._baseurl = "{}://{}:{}".format(self._protocol, self._host, self._port)
+        self._db = None
+        header = {"Content-type": "application/json"}
+        if headers is not None:
+            header.update(headers)
+        super().__init__(
+            header,
+            connection_limit=connection_limit,
+            connection_limit_per_host=connection_limit_per_host,
+            max_concurrency=max_concurrency,
+            serializer=serializer,
+        )
+
+    async def check_networking(self, timeout: float = 10):
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(self._host, int(self._port)), timeout=timeout
+            )
+            writer.close()
+        except (OSError, asyncio.TimeoutError):
+            raise Exception(
+                "[ERROR] Failed to connect to {}:{}".format(self._host, self._port)
+            )
+        print("[INFO] Connected to {}:{} successfully.".format(self._host, self._port))
+
+    async def welcome(self):
+        req_url = "{}/".format(self._baseurl)
+        return await self._request("GET", req_url, {}, timeout=10, text=True)
+
+    async def state(self):
+        req_url = "{}/state".format(self._baseurl)
+        return await self._request("GET", req_url, {})
+
+    def use_db(self, db_name: str):
+        self._db = db_name
+
+    async def load_db(
+        self,
+        db_name: str,
+        db_path: str,
+        vector_scale: int = None,
+        wal_enabled: bool = False,
+    ):
+        req_url = "{}/api/load".format(self._baseurl)
+        req_data = {"name": db_name, "path": db_path}
+        if vector_scale is not None:
+            req_data["vectorScale"] = vector_scale
+        if wal_enabled is not None:
+            req_data["walEnabled"] = wal_enabled
+        return await self._request("POST", req_url, req_data)
+
+    async def unload_db(self, db_name: str):
+        req_url = "{}/api/{}/unload".format(self._baseurl, db_name)
+        return await self._request("POST", req_url, {})
+
+    async def statistics(self):
+        if self._db is None:
+            raise Exception("[ERROR] Please use_db() first!")
+        req_url = "{}/api/{}/statistics".format(self._baseurl, self._db)
+        return await self._request("GET", req_url, {})
+
+    async def create_table(
+        self,
+        table_name: str,
+        table_fields: list[dict] = None,
+        indices: list[dict] = None,
+    ):
+        if self._db is None:
+            raise Exception("[ERROR] Please use_db() first!")
+        if table_fields is None:
+            table_fields = []
+        req_url = "{}/api/{}/schema/tables".format(self._baseurl, self._db)
+        req_data = {"name": table_name, "fields": table_fields}
+        if indices is not None:
+            req_data["indices"] = indices
+        return await self._request("POST", req_url, req_data)
+
+    async def list_tables(self):
+        if self._db is None:
+            raise Exception("[ERROR] Please use_db() first!")
+        req_url = "{}/api/{}/schema/tables/show".format(self._baseurl, self._db)
+        return await self._request("GET", req_url)
+
+    async def insert(self, table_name: str, records: list = None):
+        if self._db is None:
+            raise Exception("[ERROR] Please use_db() first!")
+        if records is None:
+            records = []
+        req_url = "{}/api/{}/data/insert".format(self._baseurl, self._db)
+        req_data = {"table": table_name, "data": records}
+        return await self._request("POST", req_url, req_data)
+
+    async def upsert(self, table_name: str, records: list = None):
+        if self._db is None:
+            raise Exception("[ERROR] Please use_db() first!")
+        if records is None:
+            records = []
+        req_url = "{}/api/{}/data/insert".format(self._baseurl, self._db)
+        req_data = {"table": table_name, "data": records, "upsert": True}
+        return await self._request("POST", req_url, req_data)
+
+    async def delete(
+        self,
+        table_name: str,
+        primary_keys: list[Union[str, int]] = None,
+        ids: list[Union[str, int]] = None,
+        filter: Optional[str] = None,
+    ):
+        """Epsilla supports delete records by primary keys as default for now."""
+        if self._db is None:
+            raise Exception("[ERROR] Please use_db() first!")
+
+        if filter is None:
+            if primary_keys is None and ids is None:
+                raise Exception(
+                    "[ERROR] Please provide at least one of primary keys(ids) and filter to delete record(s)."
+                )
+        if primary_keys is None and ids is not None:
+            primary_keys = ids
+        if primary_keys is not None and ids is not None:
+            try:
+                import sentry_sdk
+
+                sentry_sdk.sdk("Duplicate Keys with both primary keys and ids", "info")
+            except Exception as e:
+                pass
+            print(
+                "[WARN] Both primary_keys and ids are prvoided, will use primary keys by default!"
+            )
+
+        req_url = "{}/api/{}/data/delete".format(self._baseurl, self._db)
+        req_data = {"table": table_name}
+        if primary_keys is not None:
+            req_data["primaryKeys"] = primary_keys
+        if filter is not None:
+            req_data["filter"] = filter
+        return await self._request("POST", req_url, req_data)
+
+    async def rebuild(self, timeout: int = 7200):
+        req_url = "{}/api/rebuild".format(self._baseurl)
+        print("[INFO] waiting until rebuild is finished ...")
+        start_time = datetime.datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+        status_code, body = await self._request("POST", req_url, {}, timeout=timeout)
+        end_time = datetime.datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+        print("[INFO] Start Time:{}\n       End   Time:{}".format(start_time, end_time))
+        return status_code, body
+
+    async def query(
+        self,
+        table_name: str,
+        query_text: str = None,
+        query_index: str = None,
+        query_field: str = None,
+        query_vector: Union[list, dict] = None,
+        response_fields: Optional[list] = None,
+        limit: int = 2,
+        filter: Optional[str] = None,
+        with_distance: Optional[bool] = False,
+        facets: Optional[list[dict]] = None,
+        result_format: str = "records",
+        primary_key_field: Optional[str] = None,
+    ):
+        if result_format not in RESULT_FORMATS:
+            raise Exception("[ERROR] Invalid result_format: {}".format(result_format))
+        if self._db is None:
+            raise Exception("[ERROR] Please use_db() first!")
+        req_url = "{}/api/{}/data/query".format(self._baseurl, self._db)
+        req_data = {"table": table_name, "limit": limit}
+
+        if response_fields is None:
+            response_fields = []
+
+        if query_text is not None:
+            req_data["query"] = query_text
+        if query_index is not None:
+            req_data["queryIndex"] = query_index
+        if query_field is not None:
+            req_data["queryField"] = query_field
+        if query_vector is not None:
+            req_data["queryVector"] = query_vector
+        if response_fields is not None:
+            req_data["response"] = response_fields
+        if filter is not None:
+            req_data["filter"] = filter
+        if with_distance is not False:
+            req_data["withDistance"] = with_distance
+
+        if facets is not None and len(facets) > 0:
+            for facet in facets:
+                if "aggregate" not in facet:
+                    raise Exception("[ERROR] key aggregate is a must in facets!")
+            req_data["facets"] = facets
+
+        status_code, body = await self._request("POST", req_url, req_data)
+        return status_code, format_result(body, result_format, primary_key_field)
+
+    async def query_batch(
+        self,
+        table_name: str,
+        query_vectors: Optional[Sequence] = None,
+        query_texts: Optional[list[str]] = None,
+        max_in_flight: int = 64,
+        **kwargs,
+    ):
+        """Run one query per vector/text concurrently, results are returned in input order."""
+        return await async_query_batch(
+            self, table_name, query_vectors, query_texts, max_in_flight, **kwargs
+        )
+
+    async def get(
+        self,
+        table_name: str,
+        response_fields: Optional[list] = None,
+        primary_keys: Optional[list[Union[str, int]]] = None,
+        ids: Optional[list[Union[str, int]]] = None,
+        filter: Optional[str] = None,
+        skip: Optional[int] = None,
+        limit: Optional[int] = None,
+        facets: Optional[list[dict]] = None,
+        result_format: str = "records",
+        primary_key_field: Optional[str] = None,
+    ):
+        if result_format not in RESULT_FORMATS:
+            raise Exception("[ERROR] Invalid result_format: {}".format(result_format))
+        if self._db is None:
+            raise Exception("[ERROR] Please use_db() first!")
+        if primary_keys is not None and ids is not None:
+            try:
+                import sentry_sdk
+
+                sentry_sdk.sdk("Duplicate Keys with both primary keys and ids", "info")
+            except Exception as e:
+                pass
+            print(
+                "[WARN] Both primary_keys and ids are prvoided, will use primary keys by default!"
+            )
+
+        if primary_keys is None and ids is not None:
+            primary_keys = ids
+
+        req_data = {"table": table_name}
+
+        if response_fields is not None:
+            req_data["response"] = response_fields
+        if primary_keys is not None:
+            req_data["primaryKeys"] = primary_keys
+        if filter is not None:
+            req_data["filter"] = filter
+        if skip is not None:
+            req_data["skip"] = skip
+        if limit is not None:
+            req_data["limit"] = limit
+
+        if facets is not None and len(facets) > 0:
+            for facet in facets:
+                if "aggregate" not in facet:
+                    raise Exception("[ERROR] key aggregate is a must in facets!")
+            req_data["facets"] = facets
+
+        req_url = "{}/api/{}/data/get".format(self._baseurl, self._db)
+        status_code, body = await self._request("POST", req_url, req_data)
+        return status_code, format_result(body, result_format, primary_key_field)
+
+    def iter_records(
+        self,
+        table_name: str,
+        page_size: int = 1000,
+        response_fields: Optional[list] = None,
+        filter: Optional[str] = None,
+        prefetch: bool = True,
+    ):
+        """Async iterator over all records of a table, fetched page by page."""
+        return async_iter_records(
+            self, table_name, page_size, response_fields, filter, prefetch
+        )
+
+    async def drop_table(self, table_name: str = None):
+        if self._db is None:
+            raise Exception("[ERROR] Please use_db() first!")
+        req_url = "{}/api/{}/schema/tables/{}".format(
+            self._baseurl, self._db, table_name
+        )
+        return await self._request("DELETE", req_url, {})
+
+    async def drop_db(self, db_name: str):
+        req_url = "{}/api/{}/drop".format(self._baseurl, db_name)
+        return await self._request("DELETE", req_url, {})
+
+    def as_search_engine(self, **kwargs):
+        return SearchEngine(self, **kwargs)
@@ -6,13 +6,24 @@ import datetime
 import json
 import socket
 import time
-from typing import Optional, Union
+from functools import partial
+from typing import Iterable, Optional, Sequence, Union
 
 import requests
-import sentry_sdk
+from requests.adapters import HTTPAdapter
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
 
+from ..utils.batch import query_batch
+from ..utils.bulk import BulkWriter
+from ..utils.cache import QueryCache
+from ..utils.health import HealthCheckedAdapter, HealthMonitor
+from ..utils.hedge import HEDGED_OPERATIONS, HedgePolicy
+from ..utils.pagination import iter_records
+from ..utils.result_set import RESULT_FORMATS, format_result
+from ..utils.retry import RetryPolicy
 from ..utils.search_engine import SearchEngine
+from ..utils.serializer import Serializer, get_serializer
+from ..utils.streaming import StreamingResponse
 
 requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
 
@@ -24,24 +35,148 @@ class Client:
         host: str = "localhost",
         port: str = "8888",
         headers: dict = None,
+        keep_alive: bool = True,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        serializer: Union[str, Serializer] = None,
+        query_cache: Union[bool, QueryCache] = None,
+        health_check: bool = True,
+        health_monitor: HealthMonitor = None,
+        retry: Union[bool, RetryPolicy] = None,
+        hedge: Union[bool, HedgePolicy] = None,
     ):
+        """
+        keep_alive: reuse TCP/TLS connections across calls instead of sending "Connection: close".
+        pool_connections: number of per-host connection pools kept by the session.
+        pool_maxsize: maximum number of connections kept open to a single host.
+        pool_block: block when pool_maxsize connections to a host are busy instead of
+            opening extra throwaway connections, i.e. enforce a hard per-host limit.
+        serializer: "json" (default), "orjson", "auto" (orjson when installed) or a
+            Serializer instance. Record vectors and query vectors may be numpy arrays.
+        query_cache: True or a QueryCache to cache query() responses on the client;
+            insert/upsert/delete/drop_table through this client invalidate the table.
+        health_check: probe the server in the background instead of connecting in the
+            constructor; requests fail fast while the server is known to be down.
+        health_monitor: HealthMonitor to register with, defaults to the process-wide one.
+            close() unregisters, the endpoint is no longer probed once every client
+            of it has been closed.
+        retry: True or a RetryPolicy to retry calls on transient failures, see
+            utils.retry for which calls are retried.
+        hedge: True or a HedgePolicy to send a second copy of query/get calls that
+            are slower than usual and use whichever response arrives first. close()
+            only shuts down a policy created for hedge=True.
+        """
         self._protocol = protocol
         self._host = host
         self._port = port
         self._baseurl = "{}://{}:{}".format(self._protocol, self._host, self._port)
         self._db = None
         self._timeout = 10
-        self._header = {"Content-type": "application/json", "Connection": "close"}
+        self._header = {"Content-type": "application/json"}
+        if not keep_alive:
+            self._header["Connection"] = "close"
         if headers is not None:
             self._header.update(headers)
-        self.check_networking()
+        self._health_monitor = None
+        if health_check or health_monitor is not None:
+            self._health_monitor = health_monitor or HealthMonitor.shared()
+            self._health_monitor.watch(self._host, int(self._port))
+        self._session = self._create_session(pool_connections, pool_maxsize, pool_block)
+        self._serializer = get_serializer(serializer)
+        if query_cache is True:
+            query_cache = QueryCache()
+        self._query_cache = query_cache or None
+        if retry is True:
+            retry = RetryPolicy()
+        self._retry = retry or None
+        # a policy passed in may be shared with other clients, close() leaves it alone
+        self._owns_hedge = hedge is True
+        if hedge is True:
+            hedge = HedgePolicy()
+        self._hedge = hedge or None
+
+    def _create_session(
+        self, pool_connections: int, pool_maxsize: int, pool_block: bool
+    ) -> requests.Session:
+        session = requests.Session()
+        kwargs = dict(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+        )
+        if self._health_monitor is not None:
+            adapter = HealthCheckedAdapter(self._health_monitor, **kwargs)
+        else:
+            adapter = HTTPAdapter(**kwargs)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    @property
+    def query_cache(self) -> Optional[QueryCache]:
+        return self._query_cache
+
+    @property
+    def retry_policy(self) -> Optional[RetryPolicy]:
+        return self._retry
+
+    @property
+    def hedge_policy(self) -> Optional[HedgePolicy]:
+        return self._hedge
+
+    def _request(
+        self, operation: str, method: str, req_url: str, **kwargs
+    ) -> requests.Response:
+        def send():
+            return self._session.request(
+                method, url=req_url, headers=self._header, verify=False, **kwargs
+            )
+
+        if (
+            self._hedge is not None
+            and operation in HEDGED_OPERATIONS
+            and not kwargs.get("stream")
+        ):
+            send = partial(self._hedge.call, send)
+        if self._retry is None:
+            return send()
+        return self._retry.call(operation, send)
+
+    def close(self):
+        self._session.close()
+        if self._health_monitor is not None:
+            self._health_monitor.unwatch(self._host, int(self._port))
+            self._health_monitor = None
+        if self._owns_hedge:
+            self._hedge.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def health(self) -> Optional[dict]:
+        if self._health_monitor is None:
+            return None
+        endpoint = self._health_monitor.get(self._host, int(self._port))
+        return endpoint.to_dict() if endpoint is not None else None
 
     def check_networking(self):
-        socket.setdefaulttimeout(self._timeout)
-        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        check_result = s.connect_ex((self._host, int(self._port)))
-        s.close()
-        if check_result == 0:
+        if self._health_monitor is not None:
+            endpoint = self._health_monitor.check(self._host, int(self._port))
+            connected = endpoint.up
+        else:
+            try:
+                with socket.create_connection(
+                    (self._host, int(self._port)), timeout=self._timeout
+                ):
+                    connected = True
+            except OSError:
+                connected = False
+        if connected:
             print(
                 "[INFO] Connected to {}:{} successfully.".format(self._host, self._port)
             )
@@ -53,12 +188,12 @@ class Client:
     def welcome(self):
         req_url = "{}/".format(self._baseurl)
         req_data = {}
-        resp = requests.get(
-            url=req_url,
-            data=json.dumps(req_data),
-            headers=self._header,
+        resp = self._request(
+            "welcome",
+            "get",
+            req_url,
+            data=self._serializer.dumps(req_data),
             timeout=self._timeout,
-            verify=False,
         )
         status_code = resp.status_code
         body = resp.text
@@ -69,8 +204,8 @@ class Client:
     def state(self):
         req_url = "{}/state".format(self._baseurl)
         req_data = {}
-        resp = requests.get(
-            url=req_url, data=json.dumps(req_data), headers=self._header, verify=False
+        resp = self._request(
+            "state", "get", req_url, data=self._serializer.dumps(req_data)
         )
         status_code = resp.status_code
         body = resp.json()
@@ -94,8 +229,8 @@ class Client:
             req_data["vectorScale"] = vector_scale
         if wal_enabled is not None:
             req_data["walEnabled"] = wal_enabled
-        resp = requests.post(
-            url=req_url, data=json.dumps(req_data), headers=self._header, verify=False
+        resp = self._request(
+            "load_db", "post", req_url, data=self._serializer.dumps(req_data)
         )
         status_code = resp.status_code
         body = resp.json()
@@ -106,8 +241,8 @@ class Client:
     def unload_db(self, db_name: str):
         req_url = "{}/api/{}/unload".format(self._baseurl, db_name)
         req_data = {}
-        resp = requests.post(
-            url=req_url, data=json.dumps(req_data), headers=self._header, verify=False
+        resp = self._request(
+            "unload_db", "post", req_url, data=self._serializer.dumps(req_data)
         )
         status_code = resp.status_code
         body = resp.json()
@@ -120,8 +255,8 @@ class Client:
             raise Exception("[ERROR] Please use_db() first!")
         req_url = "{}/api/{}/statistics".format(self._baseurl, self._db)
         req_data = {}
-        resp = requests.get(
-            url=req_url, data=json.dumps(req_data), headers=self._header, verify=False
+        resp = self._request(
+            "statistics", "get", req_url, data=self._serializer.dumps(req_data)
         )
         status_code = resp.status_code
         body = resp.json()
@@ -143,8 +278,8 @@ class Client:
         req_data = {"name": table_name, "fields": table_fields}
         if indices is not None:
             req_data["indices"] = indices
-        resp = requests.post(
-            url=req_url, data=json.dumps(req_data), headers=self._header, verify=False
+        resp = self._request(
+            "create_table", "post", req_url, data=self._serializer.dumps(req_data)
         )
         status_code = resp.status_code
         body = resp.json()
@@ -156,7 +291,7 @@ class Client:
         if self._db is None:
             raise Exception("[ERROR] Please use_db() first!")
         req_url = "{}/api/{}/schema/tables/show".format(self._baseurl, self._db)
-        resp = requests.get(url=req_url, headers=self._header, verify=False)
+        resp = self._request("list_tables", "get", req_url)
         status_code = resp.status_code
         body = resp.json()
         resp.close()
@@ -170,9 +305,11 @@ class Client:
             records = []
         req_url = "{}/api/{}/data/insert".format(self._baseurl, self._db)
         req_data = {"table": table_name, "data": records}
-        resp = requests.post(
-            url=req_url, data=json.dumps(req_data), headers=self._header, verify=False
+        resp = self._request(
+            "insert", "post", req_url, data=self._serializer.dumps(req_data)
         )
+        if self._query_cache is not None:
+            self._query_cache.invalidate(table_name)
         status_code = resp.status_code
         body = resp.json()
         resp.close()
@@ -186,15 +323,29 @@ class Client:
             records = []
         req_url = "{}/api/{}/data/insert".format(self._baseurl, self._db)
         req_data = {"table": table_name, "data": records, "upsert": True}
-        resp = requests.post(
-            url=req_url, data=json.dumps(req_data), headers=self._header, verify=False
+        resp = self._request(
+            "upsert", "post", req_url, data=self._serializer.dumps(req_data)
         )
+        if self._query_cache is not None:
+            self._query_cache.invalidate(table_name)
         status_code = resp.status_code
         body = resp.json()
         resp.close()
         del resp
         return status_code, body
 
+    def bulk_insert(self, table_name: str, records: Iterable[dict], **kwargs):
+        """Insert an iterable of records in concurrent chunks, see utils.bulk.BulkWriter for options."""
+        if self._db is None:
+            raise Exception("[ERROR] Please use_db() first!")
+        return BulkWriter(self, **kwargs).write(table_name, records)
+
+    def bulk_upsert(self, table_name: str, records: Iterable[dict], **kwargs):
+        """Upsert an iterable of records in concurrent chunks, see utils.bulk.BulkWriter for options."""
+        if self._db is None:
+            raise Exception("[ERROR] Please use_db() first!")
+        return BulkWriter(self, **kwargs).write(table_name, records, upsert=True)
+
     def delete(
         self,
         table_name: str,
@@ -215,6 +366,8 @@ class Client:
             primary_keys = ids
         if primary_keys != None and ids != None:
             try:
+                import sentry_sdk
+
                 sentry_sdk.sdk("Duplicate Keys with both primary keys and ids", "info")
             except Exception as e:
                 pass
@@ -228,9 +381,11 @@ class Client:
             req_data["primaryKeys"] = primary_keys
         if filter != None:
             req_data["filter"] = filter
-        resp = requests.post(
-            url=req_url, data=json.dumps(req_data), headers=self._header, verify=False
+        resp = self._request(
+            "delete", "post", req_url, data=self._serializer.dumps(req_data)
         )
+        if self._query_cache is not None:
+            self._query_cache.invalidate(table_name)
         status_code = resp.status_code
         body = resp.json()
         resp.close()
@@ -242,12 +397,12 @@ class Client:
         req_data = {}
         print("[INFO] waiting until rebuild is finished ...")
         start_time = datetime.datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
-        resp = requests.post(
-            url=req_url,
-            data=json.dumps(req_data),
-            headers=self._header,
+        resp = self._request(
+            "rebuild",
+            "post",
+            req_url,
+            data=self._serializer.dumps(req_data),
             timeout=timeout,
-            verify=False,
         )
         end_time = datetime.datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
         print("[INFO] Start Time:{}\n       End   Time:{}".format(start_time, end_time))
@@ -269,7 +424,16 @@ class Client:
         filter: Optional[str] = None,
         with_distance: Optional[bool] = False,
         facets: Optional[list[dict]] = None,
+        stream: bool = False,
+        result_format: str = "records",
+        primary_key_field: Optional[str] = None,
     ):
+        if result_format not in RESULT_FORMATS:
+            raise Exception("[ERROR] Invalid result_format: {}".format(result_format))
+        if stream and result_format != "records":
+            raise Exception(
+                "[ERROR] stream=True only supports result_format='records'!"
+            )
         if self._db is None:
             raise Exception("[ERROR] Please use_db() first!")
         req_url = "{}/api/{}/data/query".format(self._baseurl, self._db)
@@ -303,14 +467,44 @@ class Client:
             else:
                 req_data["facets"] = facets
 
-        resp = requests.post(
-            url=req_url, data=json.dumps(req_data), headers=self._header, verify=False
-        )
+        data = self._serializer.dumps(req_data)
+        cache_key = None
+        if self._query_cache is not None and not stream:
+            cache_key = (req_url, data)
+            cached = self._query_cache.get(cache_key)
+            if cached is not None:
+                status_code, content = cached
+                body = json.loads(content)
+                return status_code, format_result(
+                    body, result_format, primary_key_field
+                )
+            generation = self._query_cache.generation(table_name)
+
+        resp = self._request("query", "post", req_url, data=data, stream=stream)
+        if stream:
+            return resp.status_code, StreamingResponse(resp)
         status_code = resp.status_code
         body = resp.json()
+        if cache_key is not None and status_code == 200:
+            self._query_cache.put(
+                cache_key, table_name, (status_code, resp.content), generation
+            )
         resp.close()
         del resp
-        return status_code, body
+        return status_code, format_result(body, result_format, primary_key_field)
+
+    def query_batch(
+        self,
+        table_name: str,
+        query_vectors: Optional[Sequence] = None,
+        query_texts: Optional[list[str]] = None,
+        max_in_flight: int = 8,
+        **kwargs,
+    ):
+        """Run one query per vector/text concurrently, results are returned in input order."""
+        return query_batch(
+            self, table_name, query_vectors, query_texts, max_in_flight, **kwargs
+        )
 
     def get(
         self,
@@ -322,11 +516,22 @@ class Client:
         skip: Optional[int] = None,
         limit: Optional[int] = None,
         facets: Optional[list[dict]] = None,
+        stream: bool = False,
+        result_format: str = "records",
+        primary_key_field: Optional[str] = None,
     ):
+        if result_format not in RESULT_FORMATS:
+            raise Exception("[ERROR] Invalid result_format: {}".format(result_format))
+        if stream and result_format != "records":
+            raise Exception(
+                "[ERROR] stream=True only supports result_format='records'!"
+            )
         if self._db is None:
             raise Exception("[ERROR] Please use_db() first!")
         if primary_keys is not None and ids is not None:
             try:
+                import sentry_sdk
+
                 sentry_sdk.sdk("Duplicate Keys with both primary keys and ids", "info")
             except Exception as e:
                 pass
@@ -361,14 +566,29 @@ class Client:
                 req_data["facets"] = facets
 
         req_url = "{}/api/{}/data/get".format(self._baseurl, self._db)
-        resp = requests.post(
-            url=req_url, data=json.dumps(req_data), headers=self._header, verify=False
+        resp = self._request(
+            "get", "post", req_url, data=self._serializer.dumps(req_data), stream=stream
         )
+        if stream:
+            return resp.status_code, StreamingResponse(resp)
         status_code = resp.status_code
         body = resp.json()
         resp.close()
         del resp
-        return status_code, body
+        return status_code, format_result(body, result_format, primary_key_field)
+
+    def iter_records(
+        self,
+        table_name: str,
+        page_size: int = 1000,
+        response_fields: Optional[list] = None,
+        filter: Optional[str] = None,
+        prefetch: bool = True,
+    ):
+        """Iterate over all records of a table, fetched page by page."""
+        return iter_records(
+            self, table_name, page_size, response_fields, filter, prefetch
+        )
 
     def drop_table(self, table_name: str = None):
         if self._db is None:
@@ -377,9 +597,11 @@ class Client:
             self._baseurl, self._db, table_name
         )
         req_data = {}
-        resp = requests.delete(
-            url=req_url, data=json.dumps(req_data), headers=self._header, verify=False
+        resp = self._request(
+            "drop_table", "delete", req_url, data=self._serializer.dumps(req_data)
         )
+        if self._query_cache is not None:
+            self._query_cache.invalidate(table_name)
         status_code = resp.status_code
         body = resp.json()
         resp.close()
@@ -389,8 +611,8 @@ class Client:
     def drop_db(self, db_name: str):
         req_url = "{}/api/{}/drop".format(self._baseurl, db_name)
         req_data = {}
-        resp = requests.delete(
-            url=req_url, data=json.dumps(req_data), headers=self._header, verify=False
+        resp = self._request(
+            "drop_db", "delete", req_url, data=self._serializer.dumps(req_data)
         )
         status_code = resp.status_code
         body = resp.json()
@@ -398,5 +620,5 @@ class Client:
         del resp
         return status_code, body
 
-    def as_search_engine(self):
-        return SearchEngine(self)
+    def as_search_engine(self, **kwargs):
+        return SearchEngine(self, **kwargs)
@@ -4,8 +4,12 @@
 from typing import Optional, Union, Sequence, Any, Dict, List, Mapping, cast
 from typing_extensions import Literal, TypedDict, Protocol
 
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
-import os, tarfile, requests, importlib
+import os, tarfile, requests, importlib, hashlib, json, threading, queue, itertools
+import gzip, multiprocessing, platform, shutil, tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import numpy as np
 import numpy.typing as npt
 
@@ -16,10 +20,45 @@ Vector = Union[Sequence[float], Sequence[int]]
 Embedding = Vector
 Embeddings = List[Embedding]
 
+
+@contextmanager
+def _file_lock(path: Union[str, Path]):
+    """Exclusive cross-process lock held on path for the duration of the block."""
+    with open(path, "a+b") as file:
+        if os.name == "nt":
+            import msvcrt
+
+            file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+            try:
+                yield
+            finally:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
 class EmbeddingFunction(Protocol):
     def __call__(self, texts: Documents) -> Embeddings:
         ...
 
+    # Embeddings as one contiguous (len(texts), dimensions) float32 array, which
+    # can be passed to insert/upsert (e.g. as rows) without building Python lists.
+    def embed_array(self, texts: Documents) -> npt.NDArray:
+        return np.asarray(self(texts), dtype=np.float32)
+
 
 class SentenceTransformerEmbeddingFunction(EmbeddingFunction):
     # Since we do dynamic imports we have to type this as Any
@@ -42,15 +81,22 @@ class SentenceTransformerEmbeddingFunction(EmbeddingFunction):
                     "The sentence_transformers python package is not installed. Please install it with `pip install sentence_transformers`"
                 )
             self.models[model_name] = SentenceTransformer(model_name, device=device)
+        self.model_name = model_name
         self._model = self.models[model_name]
         self._normalize_embeddings = normalize_embeddings
 
+    def embed_array(self, texts: Documents) -> npt.NDArray:
+        return np.asarray(
+            self._model.encode(
+                list(texts),
+                convert_to_numpy=True,
+                normalize_embeddings=self._normalize_embeddings,
+            ),
+            dtype=np.float32,
+        )
+
     def __call__(self, texts: Documents) -> Embeddings:
-        return self._model.encode(
-            list(texts),
-            convert_to_numpy=True,
-            normalize_embeddings=self._normalize_embeddings,
-        ).tolist()
+        return self.embed_array(texts).tolist()
 
 
 class Text2VecEmbeddingFunction(EmbeddingFunction):
@@ -61,10 +107,16 @@ class Text2VecEmbeddingFunction(EmbeddingFunction):
             raise ValueError(
                 "The text2vec python package is not installed. Please install it with `pip install text2vec`"
             )
+        self.model_name = model_name
         self._model = SentenceModel(model_name_or_path=model_name)
 
+    def embed_array(self, texts: Documents) -> npt.NDArray:
+        return np.asarray(
+            self._model.encode(list(texts), convert_to_numpy=True), dtype=np.float32
+        )
+
     def __call__(self, texts: Documents) -> Embeddings:
-        return self._model.encode(list(texts), convert_to_numpy=True).tolist()  # type: ignore # noqa E501
+        return self.embed_array(texts).tolist()  # type: ignore # noqa E501
 
 
 # implements the same functionality as "all-MiniLM-L6-v2" from sentence-transformers.
@@ -73,14 +125,58 @@ class ONNXMiniLM_L6_V2(EmbeddingFunction):
     DOWNLOAD_PATH = Path.home() / ".cache" / "onnx_models" / MODEL_NAME
     EXTRACTED_FOLDER_NAME = "onnx"
     ARCHIVE_FILENAME = "onnx.tar.gz"
+    QUANTIZED_MODEL_FILENAME = "model_quantized.onnx"
+    LOCK_FILENAME = ".lock"
+    # sha256 of the archive, verified after download when set; pin it only from
+    # the file served at MODEL_DOWNLOAD_URL, the gzip length/CRC32 check always runs
+    ARCHIVE_SHA256: Optional[str] = None
+    ONNX_FILES = [
+        "config.json",
+        "model.onnx",
+        "special_tokens_map.json",
+        "tokenizer_config.json",
+        "tokenizer.json",
+        "vocab.txt",
+    ]
     MODEL_DOWNLOAD_URL = (
         "https://config.epsilla.com/onnx.tar.gz"
     )
+    GRAPH_OPTIMIZATION_LEVELS = {
+        "disable": "ORT_DISABLE_ALL",
+        "basic": "ORT_ENABLE_BASIC",
+        "extended": "ORT_ENABLE_EXTENDED",
+        "all": "ORT_ENABLE_ALL",
+    }
     tokenizer = None
     model = None
 
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        intra_op_num_threads: Optional[int] = None,
+        inter_op_num_threads: Optional[int] = None,
+        graph_optimization_level: Optional[str] = None,
+        num_workers: int = 1,
+        use_processes: bool = False,
+        quantized: bool = False,
+        cache_optimized_model: bool = True,
+    ) -> None:
+        """
+        intra_op_num_threads/inter_op_num_threads: onnxruntime thread pool sizes, with
+            num_workers > 1 intra_op_num_threads defaults to cpu_count // num_workers.
+        graph_optimization_level: "disable", "basic", "extended" or "all" (default).
+        num_workers: run batches on this many sessions in parallel threads.
+        use_processes: shard documents across num_workers processes instead, each
+            loading its own model. Workers are started with "spawn", so scripts
+            using this need an `if __name__ == "__main__":` guard.
+        quantized: use an int8 dynamically quantized copy of the model, created from
+            model.onnx on first use and cached next to it. Faster on CPU at a small
+            accuracy cost, see examples/benchmark_embedding_quantization.py.
+        cache_optimized_model: save the graph optimized by onnxruntime next to the
+            model on first load, later sessions load it and skip graph optimization.
+            The copy is optimized up to "extended", the CPU specific passes of "all"
+            still run on every load.
+        """
         try:
             self.ort = importlib.import_module("onnxruntime")
         except ImportError:
@@ -99,13 +195,49 @@ class ONNXMiniLM_L6_V2(EmbeddingFunction):
             raise ValueError(
                 "The tqdm python package is not installed. Please install it with `pip install tqdm`"
             )
+        if num_workers > 1 and intra_op_num_threads is None:
+            intra_op_num_threads = max(1, (os.cpu_count() or 1) // num_workers)
+        if (
+            graph_optimization_level is not None
+            and graph_optimization_level not in self.GRAPH_OPTIMIZATION_LEVELS
+        ):
+            raise ValueError(
+                "Invalid graph_optimization_level: {}".format(graph_optimization_level)
+            )
+        self._session_options = {
+            "intra_op_num_threads": intra_op_num_threads,
+            "inter_op_num_threads": inter_op_num_threads,
+            "graph_optimization_level": graph_optimization_level,
+        }
+        self._num_workers = num_workers
+        self._use_processes = use_processes
+        self._quantized = quantized
+        self._cache_optimized_model = cache_optimized_model
+        self._sessions = None
+        self._executor = None
+        self._buffers = threading.local()
 
-    def _download(self, url: str, fname: str, chunk_size: int = 1024) -> None:
-        resp = requests.get(url, stream=True)
+    def _download(
+        self, url: str, fname: str, chunk_size: int = 1024 * 1024, timeout: int = 60
+    ) -> None:
+        # download into fname.part, resuming from its current size with a Range request
+        part_fname = "{}.part".format(fname)
+        offset = os.path.getsize(part_fname) if os.path.exists(part_fname) else 0
+        headers = {"Range": "bytes={}-".format(offset)} if offset else {}
+        resp = requests.get(url, stream=True, headers=headers, timeout=timeout)
+        if resp.status_code == 416:
+            # the partial file already holds the whole archive
+            resp.close()
+            os.replace(part_fname, fname)
+            return
+        resp.raise_for_status()
+        if resp.status_code != 206:
+            offset = 0
         total = int(resp.headers.get("content-length", 0))
-        with open(fname, "wb") as file, self.tqdm(
+        with open(part_fname, "ab" if offset else "wb") as file, self.tqdm(
             desc=str(fname),
-            total=total,
+            total=offset + total,
+            initial=offset,
             unit="iB",
             unit_scale=True,
             unit_divisor=1024,
@@ -113,42 +245,262 @@ class ONNXMiniLM_L6_V2(EmbeddingFunction):
             for data in resp.iter_content(chunk_size=chunk_size):
                 size = file.write(data)
                 bar.update(size)
+        if total and os.path.getsize(part_fname) != offset + total:
+            raise Exception(
+                "[ERROR] Download of {} was interrupted, "
+                "it will resume on the next call".format(url)
+            )
+        os.replace(part_fname, fname)
+
+    def _verify_archive(self, fname: str) -> bool:
+        sha256 = hashlib.sha256()
+        with open(fname, "rb") as file:
+            for data in iter(lambda: file.read(1024 * 1024), b""):
+                sha256.update(data)
+        if self.ARCHIVE_SHA256 is not None:
+            if sha256.hexdigest() != self.ARCHIVE_SHA256:
+                return False
+        # reading the whole gzip stream checks its length and CRC32 trailer
+        try:
+            with gzip.open(fname, "rb") as file:
+                while file.read(1024 * 1024):
+                    pass
+        except (OSError, EOFError):
+            return False
+        return True
 
     def _normalize(self, v: npt.NDArray) -> npt.NDArray:
         norm = np.linalg.norm(v, axis=1)
         norm[norm == 0] = 1e-12
         return v / norm[:, np.newaxis]
 
+    def _batch_buffers(self, size: int) -> tuple:
+        # flat int64 buffers reused across batches, one set per thread
+        buffers = getattr(self._buffers, "arrays", None)
+        if buffers is None or buffers[0].size < size:
+            size = max(size, 2 * buffers[0].size if buffers is not None else 0)
+            buffers = tuple(np.zeros(size, dtype=np.int64) for _ in range(3))
+            self._buffers.arrays = buffers
+        return buffers
+
+    def _run_batch(self, session, batch: list, lengths: npt.NDArray) -> npt.NDArray:
+        rows, max_length = len(batch), int(lengths.max())
+        ids_buffer, mask_buffer, token_type_buffer = self._batch_buffers(
+            rows * max_length
+        )
+        # contiguous (rows, max_length) views over the front of the buffers
+        input_ids = ids_buffer[: rows * max_length].reshape(rows, max_length)
+        attention_mask = mask_buffer[: rows * max_length].reshape(rows, max_length)
+        token_type_ids = token_type_buffer[: rows * max_length].reshape(
+            rows, max_length
+        )
+        mask = np.arange(max_length) < lengths[:, np.newaxis]
+        np.copyto(attention_mask, mask)
+        input_ids.fill(0)
+        input_ids[mask] = np.fromiter(
+            itertools.chain.from_iterable(e.ids for e in batch),
+            dtype=np.int64,
+            count=int(lengths.sum()),
+        )
+        onnx_input = {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "token_type_ids": token_type_ids,
+        }
+        model_output = session.run(None, onnx_input)
+        last_hidden_state = model_output[0]
+        # masked mean pooling: (rows, 1, seq) @ (rows, seq, hidden) -> (rows, hidden)
+        weights = mask.astype(last_hidden_state.dtype)[:, np.newaxis, :]
+        embeddings = np.matmul(weights, last_hidden_state)[:, 0, :] / np.clip(
+            lengths, a_min=1e-9, a_max=None
+        )[:, np.newaxis].astype(last_hidden_state.dtype)
+        return self._normalize(embeddings).astype(np.float32)
+
+    def _run_batch_on_pool(self, batch: list, lengths: npt.NDArray) -> npt.NDArray:
+        session = self._sessions.get()
+        try:
+            return self._run_batch(session, batch, lengths)
+        finally:
+            self._sessions.put(session)
+
     def _forward(self, documents: List[str], batch_size: int = 32) -> npt.NDArray:
         self.tokenizer = cast(self.Tokenizer, self.tokenizer)
         self.model = cast(self.ort.InferenceSession, self.model)
-        all_embeddings = []
-        for i in range(0, len(documents), batch_size):
-            batch = documents[i : i + batch_size]
-            encoded = [self.tokenizer.encode(d) for d in batch]
-            input_ids = np.array([e.ids for e in encoded])
-            attention_mask = np.array([e.attention_mask for e in encoded])
-            onnx_input = {
-                "input_ids": np.array(input_ids, dtype=np.int64),
-                "attention_mask": np.array(attention_mask, dtype=np.int64),
-                "token_type_ids": np.array(
-                    [np.zeros(len(e), dtype=np.int64) for e in input_ids],
-                    dtype=np.int64,
-                ),
-            }
-            model_output = self.model.run(None, onnx_input)
-            last_hidden_state = model_output[0]
-            input_mask_expanded = np.broadcast_to(
-                np.expand_dims(attention_mask, -1), last_hidden_state.shape
+        if self._use_processes:
+            # contiguous shards, one per process, concatenated in order
+            shard_size = max(batch_size, -(-len(documents) // self._num_workers))
+            shards = [
+                documents[i : i + shard_size]
+                for i in range(0, len(documents), shard_size)
+            ]
+            return np.concatenate(
+                list(
+                    self._executor.map(
+                        _forward_in_worker, shards, [batch_size] * len(shards)
+                    )
+                )
             )
-            embeddings = np.sum(last_hidden_state * input_mask_expanded, 1) / np.clip(
-                input_mask_expanded.sum(1), a_min=1e-9, a_max=None
+        encoded = self.tokenizer.encode_batch(list(documents))
+        lengths = np.fromiter(
+            (len(e.ids) for e in encoded), dtype=np.int64, count=len(encoded)
+        )
+        # batch documents of similar token length together and pad each batch only
+        # to its longest sequence, embeddings are put back in input order at the end
+        order = np.argsort(lengths, kind="stable")
+        batches = [
+            [encoded[j] for j in order[i : i + batch_size]]
+            for i in range(0, len(documents), batch_size)
+        ]
+        batch_lengths = [
+            lengths[order[i : i + batch_size]]
+            for i in range(0, len(documents), batch_size)
+        ]
+        if self._executor is not None and not self._use_processes and len(batches) > 1:
+            all_embeddings = list(
+                self._executor.map(self._run_batch_on_pool, batches, batch_lengths)
+            )
+        else:
+            all_embeddings = [
+                self._run_batch(self.model, batch, batch_lengths[i])
+                for i, batch in enumerate(batches)
+            ]
+        sorted_embeddings = np.concatenate(all_embeddings)
+        result = np.empty_like(sorted_embeddings)
+        result[order] = sorted_embeddings
+        return result
+
+    def _create_session_options(self):
+        options = self.ort.SessionOptions()
+        if self._session_options["intra_op_num_threads"] is not None:
+            options.intra_op_num_threads = self._session_options["intra_op_num_threads"]
+        if self._session_options["inter_op_num_threads"] is not None:
+            options.inter_op_num_threads = self._session_options["inter_op_num_threads"]
+        if self._session_options["graph_optimization_level"] is not None:
+            options.graph_optimization_level = getattr(
+                self.ort.GraphOptimizationLevel,
+                self.GRAPH_OPTIMIZATION_LEVELS[
+                    self._session_options["graph_optimization_level"]
+                ],
+            )
+        return options
+
+    def _quantize_model(self, model_path: str, quantized_model_path: str) -> None:
+        try:
+            quantization = importlib.import_module("onnxruntime.quantization")
+        except ImportError:
+            raise ValueError(
+                "The onnx python package is not installed. Please install it with `pip install onnx`"
+            )
+        # write to a temporary file first so other processes never load a partial model
+        tmp_path = "{}.{}.tmp".format(quantized_model_path, os.getpid())
+        try:
+            quantization.quantize_dynamic(
+                model_path, tmp_path, weight_type=quantization.QuantType.QInt8
             )
-            embeddings = self._normalize(embeddings).astype(np.float32)
-            all_embeddings.append(embeddings)
-        return np.concatenate(all_embeddings)
+            os.replace(tmp_path, quantized_model_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _model_path(self) -> str:
+        model_path = os.path.join(
+            self.DOWNLOAD_PATH, self.EXTRACTED_FOLDER_NAME, "model.onnx"
+        )
+        if not self._quantized:
+            return model_path
+        quantized_model_path = os.path.join(
+            self.DOWNLOAD_PATH,
+            self.EXTRACTED_FOLDER_NAME,
+            self.QUANTIZED_MODEL_FILENAME,
+        )
+        if not os.path.exists(quantized_model_path):
+            with _file_lock(os.path.join(self.DOWNLOAD_PATH, self.LOCK_FILENAME)):
+                if not os.path.exists(quantized_model_path):
+                    self._quantize_model(model_path, quantized_model_path)
+        return quantized_model_path
+
+    def _cached_optimization_level(self) -> str:
+        # level "all" adds layout transformations tuned to the instruction sets of
+        # the CPU it runs on, so the on-disk copy stops at "extended" and those are
+        # applied again whenever the copy is loaded
+        level = self._session_options["graph_optimization_level"] or "all"
+        return "extended" if level == "all" else level
+
+    def _optimized_model_path(self, model_path: str) -> str:
+        # optimized graphs depend on the optimization level and the onnxruntime version
+        return "{}.{}.ort-{}.{}.onnx".format(
+            os.path.splitext(model_path)[0],
+            self._cached_optimization_level(),
+            self.ort.__version__,
+            platform.machine() or "unknown",
+        )
+
+    def _optimization_level(self, level: str):
+        return getattr(
+            self.ort.GraphOptimizationLevel, self.GRAPH_OPTIMIZATION_LEVELS[level]
+        )
+
+    def _create_session(self):
+        model_path = self._model_path()
+        options = self._create_session_options()
+        if (
+            not self._cache_optimized_model
+            or self._session_options["graph_optimization_level"] == "disable"
+        ):
+            return self.ort.InferenceSession(
+                model_path,
+                sess_options=options,
+                providers=["CPUExecutionProvider"],
+            )
+        level = self._session_options["graph_optimization_level"] or "all"
+        cached_level = self._cached_optimization_level()
+        optimized_model_path = self._optimized_model_path(model_path)
+        if not os.path.exists(optimized_model_path):
+            tmp_path = "{}.{}.tmp".format(optimized_model_path, os.getpid())
+            save_options = self._create_session_options()
+            save_options.graph_optimization_level = self._optimization_level(
+                cached_level
+            )
+            save_options.optimized_model_filepath = tmp_path
+            session = self.ort.InferenceSession(
+                model_path,
+                sess_options=save_options,
+                providers=["CPUExecutionProvider"],
+            )
+            if os.path.exists(tmp_path):
+                os.replace(tmp_path, optimized_model_path)
+            if level == cached_level or not os.path.exists(optimized_model_path):
+                return session
+        # the cached graph already has every pass up to cached_level applied
+        options.graph_optimization_level = self._optimization_level(
+            "all" if level == "all" else "disable"
+        )
+        return self.ort.InferenceSession(
+            optimized_model_path,
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
 
     def _init_model_and_tokenizer(self) -> None:
+        if self._use_processes:
+            # workers load their own tokenizer and session. The parent creates
+            # neither and workers are spawned, not forked: forking a process that
+            # already runs onnxruntime threads can deadlock the child.
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._num_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(
+                        type(self),
+                        dict(
+                            self._session_options,
+                            quantized=self._quantized,
+                            cache_optimized_model=self._cache_optimized_model,
+                        ),
+                    ),
+                )
+            return
         if self.model is None and self.tokenizer is None:
             self.tokenizer = self.Tokenizer.from_file(
                 os.path.join(
@@ -156,50 +508,345 @@ class ONNXMiniLM_L6_V2(EmbeddingFunction):
                 )
             )
             self.tokenizer.enable_truncation(max_length=256)
-            self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]", length=256)
-            self.model = self.ort.InferenceSession(
-                os.path.join(
-                    self.DOWNLOAD_PATH, self.EXTRACTED_FOLDER_NAME, "model.onnx"
+            # batches are padded per length bucket in _forward and the mask is built
+            # from the token counts, a padding block in tokenizer.json (often Fixed
+            # 128 in exports) would make [PAD] tokens count as real ones
+            self.tokenizer.no_padding()
+            self.model = self._create_session()
+        if self._num_workers > 1 and self._executor is None:
+            self._sessions = queue.Queue()
+            self._sessions.put(self.model)
+            for _ in range(self._num_workers - 1):
+                self._sessions.put(self._create_session())
+            self._executor = ThreadPoolExecutor(max_workers=self._num_workers)
+
+    def preload(self) -> None:
+        """Download the model if needed and load the tokenizer and session(s)."""
+        self._download_model_if_not_exists()
+        self._init_model_and_tokenizer()
+
+    def warmup(self, batch_size: int = 32) -> None:
+        """preload() and run a dummy batch on every session, so the first real call
+        does not pay for loading or first-run allocations."""
+        self.preload()
+        documents = ["warmup"] * batch_size
+        if self._use_processes and self._executor is not None:
+            list(
+                self._executor.map(
+                    _forward_in_worker,
+                    [documents] * self._num_workers,
+                    [batch_size] * self._num_workers,
                 )
             )
+        elif self._sessions is not None:
+            encoded = self.tokenizer.encode_batch(documents)
+            lengths = np.array([len(e.ids) for e in encoded], dtype=np.int64)
+            for session in list(self._sessions.queue):
+                self._run_batch(session, encoded, lengths)
+        else:
+            self._forward(documents, batch_size)
+
+    def embed_array(self, texts: Documents) -> npt.NDArray:
+        self.preload()
+        return self._forward(texts)
 
     def __call__(self, texts: Documents) -> Embeddings:
-        self._download_model_if_not_exists()
-        self._init_model_and_tokenizer()
-        res = cast(Embeddings, self._forward(texts).tolist())
+        res = cast(Embeddings, self.embed_array(texts).tolist())
         return res
 
-    def _download_model_if_not_exists(self) -> None:
-        onnx_files = [
-            "config.json",
-            "model.onnx",
-            "special_tokens_map.json",
-            "tokenizer_config.json",
-            "tokenizer.json",
-            "vocab.txt",
-        ]
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+            self._sessions = None
+
+    def _model_files_exist(self) -> bool:
         extracted_folder = os.path.join(self.DOWNLOAD_PATH, self.EXTRACTED_FOLDER_NAME)
-        onnx_files_exist = True
-        for f in onnx_files:
-            if not os.path.exists(os.path.join(extracted_folder, f)):
-                onnx_files_exist = False
-                break
-        if not onnx_files_exist:
-            os.makedirs(self.DOWNLOAD_PATH, exist_ok=True)
-            if not os.path.exists(
-                os.path.join(self.DOWNLOAD_PATH, self.ARCHIVE_FILENAME)
+        return all(
+            os.path.exists(os.path.join(extracted_folder, f)) for f in self.ONNX_FILES
+        )
+
+    def _download_model_if_not_exists(self) -> None:
+        if self._model_files_exist():
+            return
+        os.makedirs(self.DOWNLOAD_PATH, exist_ok=True)
+        # only one process downloads and extracts, the others wait and reuse it
+        with _file_lock(os.path.join(self.DOWNLOAD_PATH, self.LOCK_FILENAME)):
+            if self._model_files_exist():
+                return
+            archive = os.path.join(self.DOWNLOAD_PATH, self.ARCHIVE_FILENAME)
+            if os.path.exists(archive) and not self._verify_archive(archive):
+                os.remove(archive)
+            if not os.path.exists(archive):
+                self._download(url=self.MODEL_DOWNLOAD_URL, fname=archive)
+                if not self._verify_archive(archive):
+                    os.remove(archive)
+                    raise Exception(
+                        "[ERROR] Checksum verification of {} failed".format(
+                            self.MODEL_DOWNLOAD_URL
+                        )
+                    )
+            # extract into a temporary directory and move the folder into place,
+            # so an interrupted extraction never leaves a half populated model folder
+            tmp_dir = tempfile.mkdtemp(prefix=".extract-", dir=self.DOWNLOAD_PATH)
+            try:
+                with tarfile.open(name=archive, mode="r:gz") as tar:
+                    if hasattr(tarfile, "data_filter"):
+                        tar.extractall(path=tmp_dir, filter="data")
+                    else:
+                        tar.extractall(path=tmp_dir)
+                extracted_folder = os.path.join(
+                    self.DOWNLOAD_PATH, self.EXTRACTED_FOLDER_NAME
+                )
+                if os.path.exists(extracted_folder):
+                    shutil.rmtree(extracted_folder)
+                os.rename(
+                    os.path.join(tmp_dir, self.EXTRACTED_FOLDER_NAME), extracted_folder
+                )
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+class CachedEmbeddingFunction(EmbeddingFunction):
+    """Caching wrapper around any EmbeddingFunction.
+
+    Embeddings are keyed by sha256(model key + text). Recently used ones are
+    kept in an in-memory LRU; with cache_dir set they are also appended to an
+    on-disk float32 matrix (memory-mapped for reads) plus an index file of
+    keys, so they survive restarts. Several instances and processes can share
+    a cache_dir: appends hold a file lock and pick up rows written by others
+    before numbering their own.
+    """
+
+    MATRIX_FILENAME = "embeddings.f32"
+    INDEX_FILENAME = "embeddings.idx"
+    META_FILENAME = "meta.json"
+    LOCK_FILENAME = ".lock"
+    KEY_SIZE = hashlib.sha256().digest_size
+    # attributes of the wrapped function that change its output for the same model
+    OUTPUT_SETTINGS = ("_quantized", "_normalize_embeddings")
+
+    def __init__(
+        self,
+        embedding_function: EmbeddingFunction,
+        model_name: Optional[str] = None,
+        maxsize: int = 10000,
+        cache_dir: Optional[Union[str, Path]] = None,
+    ):
+        """
+        model_name: part of the cache key, defaults to the class and model name of
+            the wrapped function plus its quantized/normalize_embeddings settings.
+        maxsize: number of embeddings kept in memory.
+        cache_dir: directory of the on-disk tier, disabled by default.
+        """
+        self._function = embedding_function
+        if model_name is None:
+            model_name = self._default_model_name(embedding_function)
+        self.model_name = model_name
+        self._maxsize = maxsize
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self._dimensions = None
+        self._rows = {}
+        # rows of the on-disk files read into _rows so far
+        self._disk_rows = 0
+        self._matrix = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self._cache_dir is not None:
+            self._open_disk_cache()
+
+    @classmethod
+    def _default_model_name(cls, embedding_function: EmbeddingFunction) -> str:
+        name = getattr(embedding_function, "model_name", None) or getattr(
+            embedding_function, "MODEL_NAME", None
+        )
+        parts = [type(embedding_function).__name__]
+        if name is not None:
+            parts.append(str(name))
+        for setting in cls.OUTPUT_SETTINGS:
+            if hasattr(embedding_function, setting):
+                parts.append(
+                    "{}={}".format(
+                        setting.lstrip("_"), getattr(embedding_function, setting)
+                    )
+                )
+        return ":".join(parts)
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.sha256(
+            self.model_name.encode("utf-8") + b"\0" + text.encode("utf-8")
+        ).digest()
+
+    def _disk_lock(self):
+        return _file_lock(self._cache_dir / self.LOCK_FILENAME)
+
+    def _read_meta(self) -> bool:
+        meta_path = self._cache_dir / self.META_FILENAME
+        if self._dimensions is None and meta_path.exists():
+            with open(meta_path) as file:
+                self._dimensions = json.load(file)["dimensions"]
+        return self._dimensions is not None
+
+    def _open_disk_cache(self) -> None:
+        os.makedirs(self._cache_dir, exist_ok=True)
+        with self._disk_lock():
+            if not self._read_meta():
+                return
+            for filename in (self.INDEX_FILENAME, self.MATRIX_FILENAME):
+                open(self._cache_dir / filename, "ab").close()
+            self._load_index()
+            # rows are written before their keys, drop a partially written tail
+            # left by a writer that died, no other writer runs under the lock
+            with open(self._cache_dir / self.INDEX_FILENAME, "r+b") as file:
+                file.truncate(self._disk_rows * self.KEY_SIZE)
+            with open(self._cache_dir / self.MATRIX_FILENAME, "r+b") as file:
+                file.truncate(self._disk_rows * self._dimensions * 4)
+
+    def _load_index(self) -> None:
+        """Read keys appended to the index since the last call."""
+        if not self._read_meta():
+            return
+        index_path = self._cache_dir / self.INDEX_FILENAME
+        matrix_path = self._cache_dir / self.MATRIX_FILENAME
+        if not index_path.exists():
+            return
+        with open(index_path, "rb") as file:
+            file.seek(self._disk_rows * self.KEY_SIZE)
+            index = file.read()
+        rows = min(
+            len(index) // self.KEY_SIZE,
+            os.path.getsize(matrix_path) // (self._dimensions * 4) - self._disk_rows,
+        )
+        for i in range(max(rows, 0)):
+            key = index[i * self.KEY_SIZE : (i + 1) * self.KEY_SIZE]
+            self._rows.setdefault(key, self._disk_rows + i)
+        self._disk_rows += max(rows, 0)
+
+    def _disk_get(self, key: bytes) -> Optional[npt.NDArray]:
+        row = self._rows.get(key)
+        if row is None:
+            index_path = self._cache_dir / self.INDEX_FILENAME
+            # another instance may have appended it
+            if (
+                index_path.exists()
+                and os.path.getsize(index_path) > self._disk_rows * self.KEY_SIZE
             ):
-                self._download(
-                    url=self.MODEL_DOWNLOAD_URL,
-                    fname=os.path.join(self.DOWNLOAD_PATH, self.ARCHIVE_FILENAME),
+                self._load_index()
+                row = self._rows.get(key)
+            if row is None:
+                return None
+        if self._matrix is None or self._matrix.shape[0] <= row:
+            self._matrix = np.memmap(
+                self._cache_dir / self.MATRIX_FILENAME,
+                dtype=np.float32,
+                mode="r",
+                shape=(self._disk_rows, self._dimensions),
+            )
+        return np.array(self._matrix[row])
+
+    def _disk_put(self, keys: List[bytes], embeddings: npt.NDArray) -> None:
+        with self._disk_lock():
+            self._load_index()
+            if self._dimensions is None:
+                self._dimensions = embeddings.shape[1]
+                with open(self._cache_dir / self.META_FILENAME, "w") as file:
+                    json.dump({"dimensions": self._dimensions}, file)
+            elif embeddings.shape[1] != self._dimensions:
+                raise Exception(
+                    "[ERROR] Embedding dimensions {} do not match the cache in {} ({})".format(
+                        embeddings.shape[1], self._cache_dir, self._dimensions
+                    )
                 )
-            with tarfile.open(
-                name=os.path.join(self.DOWNLOAD_PATH, self.ARCHIVE_FILENAME),
-                mode="r:gz",
-            ) as tar:
-                tar.extractall(path=self.DOWNLOAD_PATH)
+            new = [i for i, key in enumerate(keys) if key not in self._rows]
+            if not new:
+                return
+            keys = [keys[i] for i in new]
+            embeddings = embeddings[new]
+            with open(self._cache_dir / self.MATRIX_FILENAME, "ab") as file:
+                file.write(np.ascontiguousarray(embeddings).tobytes())
+            with open(self._cache_dir / self.INDEX_FILENAME, "ab") as file:
+                file.write(b"".join(keys))
+            for key in keys:
+                self._rows[key] = self._disk_rows
+                self._disk_rows += 1
+
+    def _memory_put(self, key: bytes, embedding: npt.NDArray) -> None:
+        self._memory[key] = embedding
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._maxsize:
+            self._memory.popitem(last=False)
+
+    def embed_array(self, texts: Documents) -> npt.NDArray:
+        texts = list(texts)
+        keys = [self._key(text) for text in texts]
+        found = {}
+        missing = OrderedDict()
+        with self._lock:
+            for key, text in zip(keys, texts):
+                if key in found or key in missing:
+                    continue
+                embedding = self._memory.get(key)
+                if embedding is not None:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                elif self._cache_dir is not None:
+                    embedding = self._disk_get(key)
+                    if embedding is not None:
+                        self._memory_put(key, embedding)
+                        self.disk_hits += 1
+                if embedding is None:
+                    missing[key] = text
+                    self.misses += 1
+                else:
+                    found[key] = embedding
+        if missing:
+            embed_array = getattr(self._function, "embed_array", self._function)
+            computed = np.asarray(embed_array(list(missing.values())), dtype=np.float32)
+            with self._lock:
+                new_keys = [key for key in missing if key not in self._rows]
+                if self._cache_dir is not None and new_keys:
+                    positions = {key: i for i, key in enumerate(missing)}
+                    self._disk_put(
+                        new_keys, computed[[positions[key] for key in new_keys]]
+                    )
+                for key, embedding in zip(missing, computed):
+                    embedding = embedding.copy()
+                    self._memory_put(key, embedding)
+                    found[key] = embedding
+        if not texts:
+            return np.empty((0, self._dimensions or 0), dtype=np.float32)
+        return np.stack([found[key] for key in keys])
+
+    def __call__(self, texts: Documents) -> Embeddings:
+        return cast(Embeddings, self.embed_array(texts).tolist())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "memory_size": len(self._memory),
+                "disk_size": self._disk_rows,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
+
+
+_worker_embedding_function = None
+
+
+def _init_worker(cls: type, kwargs: dict) -> None:
+    global _worker_embedding_function
+    _worker_embedding_function = cls(**kwargs)
+    _worker_embedding_function.preload()
+
+
+def _forward_in_worker(documents: List[str], batch_size: int) -> npt.NDArray:
+    return _worker_embedding_function._forward(documents, batch_size)
 
 
-def DefaultEmbeddingFunction() -> Optional[EmbeddingFunction]:
-    return ONNXMiniLM_L6_V2()
+def DefaultEmbeddingFunction(**kwargs) -> Optional[EmbeddingFunction]:
+    return ONNXMiniLM_L6_V2(**kwargs)
 
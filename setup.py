@@ -22,6 +22,7 @@ setup(
     include_package_data=True,
     platforms="any",
     install_requires=["requests", "sentry_sdk", "posthog", "pydantic"],
+    extras_require={"async": ["aiohttp"], "speedups": ["orjson"]},
     url="https://github.com/epsilla-cloud/epsilla-python-client",
     project_urls={
         "Source": "https://github.com/epsilla-cloud/epsilla-python-client",
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+from pyepsilla.utils import BulkWriter, RetryPolicy
+
+
+class FakeClient:
+    """Answers every insert with the given status code and counts the calls."""
+
+    def __init__(self, status_code: int, retry_policy=None):
+        self.status_code = status_code
+        self.retry_policy = retry_policy
+        self.calls = 0
+
+    def insert(self, table_name, records):
+        self.calls += 1
+        return self.status_code, {"statusCode": self.status_code}
+
+    upsert = insert
+
+
+def test_retries_transient_failures():
+    client = FakeClient(503)
+    writer = BulkWriter(client, chunk_size=10, max_retries=2, retry_interval=0)
+    result = writer.write("MyTable", [{"ID": i} for i in range(20)])
+    assert client.calls == 2 * 3
+    assert result["retries"] == 2 * 2
+    assert result["failed_chunks"] == 2
+
+
+def test_leaves_retries_to_client_retry_policy():
+    client = FakeClient(503, retry_policy=RetryPolicy())
+    writer = BulkWriter(client, chunk_size=10, max_retries=2, retry_interval=0)
+    result = writer.write("MyTable", [{"ID": i} for i in range(20)])
+    assert client.calls == 2
+    assert result["retries"] == 0
+    assert result["failed_chunks"] == 2
+
+
+def test_does_not_retry_client_errors():
+    client = FakeClient(400)
+    writer = BulkWriter(client, chunk_size=10, max_retries=2, retry_interval=0)
+    result = writer.write("MyTable", [{"ID": i} for i in range(10)])
+    assert client.calls == 1
+    assert result["failed_records"] == 10
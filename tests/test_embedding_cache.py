@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+import numpy as np
+
+from pyepsilla.vectordb.utils.embedding_functions import CachedEmbeddingFunction
+
+
+class FakeEmbeddingFunction:
+    """Embeds a text as its length, scaled to unit norm when normalizing."""
+
+    model_name = "fake-model"
+
+    def __init__(self, normalize_embeddings: bool = False):
+        self._normalize_embeddings = normalize_embeddings
+
+    def embed_array(self, texts):
+        array = np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+        if self._normalize_embeddings:
+            array /= np.linalg.norm(array, axis=1)[:, np.newaxis]
+        return array
+
+    def __call__(self, texts):
+        return self.embed_array(texts).tolist()
+
+
+def test_default_key_includes_output_settings():
+    plain = CachedEmbeddingFunction(FakeEmbeddingFunction())
+    normalized = CachedEmbeddingFunction(
+        FakeEmbeddingFunction(normalize_embeddings=True)
+    )
+    assert plain.model_name != normalized.model_name
+    assert plain.model_name.startswith("FakeEmbeddingFunction:fake-model")
+
+
+def test_shared_cache_dir_keeps_settings_apart(tmp_path):
+    texts = ["hello", "a longer text"]
+    plain = CachedEmbeddingFunction(FakeEmbeddingFunction(), cache_dir=tmp_path)
+    expected = plain.embed_array(texts)
+    normalized = CachedEmbeddingFunction(
+        FakeEmbeddingFunction(normalize_embeddings=True), cache_dir=tmp_path
+    )
+    result = normalized.embed_array(texts)
+    assert normalized.disk_hits == 0
+    np.testing.assert_allclose(np.linalg.norm(result, axis=1), 1.0, rtol=1e-6)
+
+    reopened = CachedEmbeddingFunction(FakeEmbeddingFunction(), cache_dir=tmp_path)
+    np.testing.assert_array_equal(reopened.embed_array(texts), expected)
+    assert reopened.disk_hits == len(texts)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+import socket
+import time
+
+from pyepsilla import vectordb
+from pyepsilla.utils.health import HealthMonitor
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(condition, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_close_unwatches_endpoint():
+    port = _free_port()
+    monitor = HealthMonitor(interval=0.05, down_interval=0.05)
+    first = vectordb.Client(host="127.0.0.1", port=str(port), health_monitor=monitor)
+    with vectordb.Client(
+        host="127.0.0.1", port=str(port), health_monitor=monitor
+    ) as second:
+        assert len(monitor.status()) == 1
+    # still watched by the first client
+    assert monitor.get("127.0.0.1", port) is not None
+    first.close()
+    first.close()
+    assert monitor.status() == []
+    # the probe thread exits once there is nothing left to probe
+    assert _wait_for(lambda: monitor._thread is None)
+
+
+def test_check_does_not_watch():
+    port = _free_port()
+    monitor = HealthMonitor()
+    endpoint = monitor.check("127.0.0.1", port)
+    assert endpoint.consecutive_failures == 1
+    assert monitor.status() == []
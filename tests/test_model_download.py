@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+import gzip
+import hashlib
+import io
+import multiprocessing
+import os
+import tarfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("tokenizers")
+pytest.importorskip("tqdm")
+
+from pyepsilla.vectordb.utils.embedding_functions import ONNXMiniLM_L6_V2
+
+
+def _make_archive() -> bytes:
+    # incompressible and deterministic (gzip mtime 0), so spawned processes
+    # build the same bytes and the download spans several 1 MiB chunks
+    model = b"".join(hashlib.sha256(str(i).encode()).digest() for i in range(100000))
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb", mtime=0) as gz:
+        with tarfile.open(fileobj=gz, mode="w") as tar:
+            for name in ONNXMiniLM_L6_V2.ONNX_FILES:
+                data = model if name == "model.onnx" else name.encode()
+                info = tarfile.TarInfo("onnx/{}".format(name))
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+ARCHIVE = _make_archive()
+ARCHIVE_SHA256 = hashlib.sha256(ARCHIVE).hexdigest()
+
+
+class ArchiveServer:
+    """Local stand-in for the model host serving one archive, with Range support."""
+
+    def __init__(self, body: bytes = ARCHIVE):
+        self.body = body
+        self.requests = []
+        # close the connection after this many bytes of the next response
+        self.cut_after = None
+        self.delay = 0.0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.requests.append(dict(self.headers))
+                time.sleep(server.delay)
+                start = 0
+                if "Range" in self.headers:
+                    start = int(self.headers["Range"][len("bytes=") :].rstrip("-"))
+                    if start >= len(server.body):
+                        self.send_response(416)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    self.send_response(206)
+                    self.send_header(
+                        "Content-Range",
+                        "bytes {}-{}/{}".format(
+                            start, len(server.body) - 1, len(server.body)
+                        ),
+                    )
+                else:
+                    self.send_response(200)
+                body = server.body[start:]
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if server.cut_after is not None:
+                    body, server.cut_after = body[: server.cut_after], None
+                    self.close_connection = True
+                self.wfile.write(body)
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = "http://127.0.0.1:{}/onnx.tar.gz".format(self._httpd.server_port)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    server = ArchiveServer()
+    yield server
+    server.close()
+
+
+def _model(download_path, url: str, sha256: str = ARCHIVE_SHA256) -> ONNXMiniLM_L6_V2:
+    model = ONNXMiniLM_L6_V2()
+    model.DOWNLOAD_PATH = Path(download_path)
+    model.MODEL_DOWNLOAD_URL = url
+    model.ARCHIVE_SHA256 = sha256
+    return model
+
+
+def _download_in_process(download_path: str, url: str):
+    _model(download_path, url)._download_model_if_not_exists()
+
+
+def test_download_and_extract(tmp_path, server):
+    model = _model(tmp_path, server.url)
+    model._download_model_if_not_exists()
+    assert model._model_files_exist()
+    assert len(server.requests) == 1
+    assert not os.path.exists(tmp_path / "onnx.tar.gz.part")
+
+
+def test_resume_interrupted_download(tmp_path, server):
+    model = _model(tmp_path, server.url)
+    server.cut_after = len(ARCHIVE) * 3 // 4
+    with pytest.raises(Exception):
+        model._download_model_if_not_exists()
+    offset = os.path.getsize(tmp_path / "onnx.tar.gz.part")
+    assert 0 < offset < len(ARCHIVE)
+    assert not model._model_files_exist()
+
+    model._download_model_if_not_exists()
+    assert server.requests[-1]["Range"] == "bytes={}-".format(offset)
+    assert model._model_files_exist()
+    with open(tmp_path / "onnx.tar.gz", "rb") as file:
+        assert file.read() == ARCHIVE
+
+
+def test_resume_complete_partial_file(tmp_path, server):
+    (tmp_path / "onnx.tar.gz.part").write_bytes(ARCHIVE)
+    model = _model(tmp_path, server.url)
+    model._download_model_if_not_exists()
+    assert server.requests[-1]["Range"] == "bytes={}-".format(len(ARCHIVE))
+    assert model._model_files_exist()
+
+
+def test_reject_corrupt_archive(tmp_path, server):
+    corrupt = bytearray(ARCHIVE)
+    corrupt[len(corrupt) // 2] ^= 0xFF
+    server.body = bytes(corrupt)
+    model = _model(tmp_path, server.url)
+    with pytest.raises(Exception, match="Checksum verification"):
+        model._download_model_if_not_exists()
+    assert not os.path.exists(tmp_path / "onnx.tar.gz")
+    assert not model._model_files_exist()
+
+    server.body = ARCHIVE
+    model._download_model_if_not_exists()
+    assert model._model_files_exist()
+
+
+def test_reject_corrupt_archive_without_sha256(tmp_path, server):
+    # without a pinned hash the gzip length and CRC32 trailer still catch truncation
+    server.body = ARCHIVE[:-16]
+    model = _model(tmp_path, server.url, sha256=None)
+    with pytest.raises(Exception, match="Checksum verification"):
+        model._download_model_if_not_exists()
+    assert not model._model_files_exist()
+
+
+def test_replace_corrupt_cached_archive(tmp_path, server):
+    (tmp_path / "onnx.tar.gz").write_bytes(ARCHIVE[: len(ARCHIVE) // 2])
+    model = _model(tmp_path, server.url)
+    model._download_model_if_not_exists()
+    assert len(server.requests) == 1
+    assert model._model_files_exist()
+
+
+def test_concurrent_processes_download_once(tmp_path, server):
+    # keep the first download in flight long enough for the others to queue on the lock
+    server.delay = 0.5
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=_download_in_process, args=(str(tmp_path), server.url))
+        for _ in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+    assert [process.exitcode for process in processes] == [0] * len(processes)
+    assert len(server.requests) == 1
+    assert _model(tmp_path, server.url)._model_files_exist()
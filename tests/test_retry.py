@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from pyepsilla import vectordb
+from pyepsilla.utils import RetryPolicy
+from pyepsilla.utils.health import EndpointUnavailable, HealthMonitor
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        data = json.dumps({"statusCode": 200, "result": []}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class LateServer:
+    """Reserves a free port and starts serving on it only when start() is called."""
+
+    def __init__(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self._server = None
+
+    def start(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+@pytest.fixture
+def server():
+    server = LateServer()
+    yield server
+    server.close()
+
+
+def _client(port: int, retry: RetryPolicy) -> vectordb.Client:
+    monitor = HealthMonitor(interval=60, down_interval=0.05)
+    client = vectordb.Client(
+        host="127.0.0.1", port=str(port), health_monitor=monitor, retry=retry
+    )
+    client.use_db("MyDB")
+    return client
+
+
+def test_retry_through_health_gate_until_server_is_up(server):
+    retry = RetryPolicy(max_attempts=20, backoff_base=0.02, backoff_max=0.1)
+    client = _client(server.port, retry)
+    threading.Timer(0.3, server.start).start()
+    status_code, _ = client.get(table_name="MyTable")
+    assert status_code == 200
+    assert client.health["up"] is True
+    stats = retry.stats()
+    assert stats["recovered"] == 1
+    # refused connects mark the endpoint down, after which the health gate
+    # fails fast and those attempts are retried as well
+    assert stats["reasons"].get("ConnectionError", 0) >= 3
+    assert stats["reasons"].get("EndpointUnavailable", 0) >= 1
+
+
+def test_retry_non_idempotent_call_rejected_by_health_gate(server):
+    retry = RetryPolicy(max_attempts=20, backoff_base=0.02, backoff_max=0.1)
+    client = _client(server.port, retry)
+    threading.Timer(0.3, server.start).start()
+    # the health gate rejects the request before sending it, so even an
+    # insert is safe to resend
+    status_code, _ = client.insert(table_name="MyTable", records=[{"ID": 1}])
+    assert status_code == 200
+    assert retry.stats()["reasons"].get("EndpointUnavailable", 0) >= 1
+
+
+def test_health_gate_error_when_retries_are_exhausted(server):
+    retry = RetryPolicy(max_attempts=5, backoff_base=0.001, jitter=False)
+    client = _client(server.port, retry)
+    start = time.monotonic()
+    with pytest.raises(EndpointUnavailable):
+        client.get(table_name="MyTable")
+    assert time.monotonic() - start < 5
+    assert retry.stats()["exhausted"] == 1
+    assert client.health["up"] is False
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+import json
+
+import numpy as np
+import pytest
+
+from pyepsilla.utils.serializer import JSONSerializer, get_serializer
+
+
+def test_default_is_json():
+    assert isinstance(get_serializer(None), JSONSerializer)
+
+
+def test_float32_arrays_round_trip_as_floats():
+    array = np.array([1, 0.1, -2.5, 1e20, 1e-7, 3.4e38], dtype=np.float32)
+    values = json.loads(JSONSerializer().dumps({"v": array}))["v"]
+    assert all(isinstance(value, float) for value in values)
+    np.testing.assert_array_equal(np.array(values, dtype=np.float32), array)
+
+
+def test_matches_plain_json_for_lists():
+    body = {"v": np.ones(2, dtype=np.float64), "n": np.arange(3)}
+    assert json.loads(JSONSerializer().dumps(body)) == {
+        "v": [1.0, 1.0],
+        "n": [0, 1, 2],
+    }
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        [float("nan")],
+        [float("inf")],
+        np.array([np.nan], dtype=np.float32),
+        np.array([-np.inf]),
+    ],
+)
+def test_non_finite_values_are_rejected(value):
+    with pytest.raises(ValueError):
+        JSONSerializer().dumps({"v": value})